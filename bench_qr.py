@@ -0,0 +1,217 @@
+"""
+QR decode benchmark.
+
+Renders ticket QR codes for the IDs in the sample ENTRY*.xlsx files, applies
+gate-like distortions (low resolution, blur, rotation, perspective, noise,
+JPEG compression) and times every decoder configuration on the same corpus.
+Reports success rate and latency percentiles per configuration and distortion.
+
+    python bench_qr.py                       # all configs, all ENTRY*.xlsx IDs
+    python bench_qr.py --limit 20 --repeat 3
+    python bench_qr.py --config opencv --config cascade --csv results.csv
+    python bench_qr.py --save-corpus corpus/ # also write the images out
+"""
+import argparse
+import csv
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from qrscan import DECODE_BUDGET_MS, DECODE_STAGES, decode_cascade
+from tickets import ticket_image
+
+# decoder configuration name -> cascade stages
+CONFIGS = {
+    "opencv": ["opencv"],
+    "opencv+full_res": ["opencv", "full_res"],  # the scan path before the cascade
+    "cascade": DECODE_STAGES,
+}
+
+CANVAS = (960, 1280)  # h, w of a typical tablet camera photo
+
+
+# --- Corpus ---
+
+def load_ticket_ids(pattern: str = "ENTRY*.xlsx") -> list:
+    """Ticket IDs from the sample entry lists, without repeats"""
+    ids = []
+    for path in sorted(glob.glob(pattern)):
+        df = pd.read_excel(path)
+        if "ID" in df.columns:
+            ids.extend(str(v).strip() for v in df["ID"].dropna())
+    return list(dict.fromkeys(i for i in ids if i))
+
+
+def render_ticket(ticket_id: str, module_px: int, rng: np.random.Generator) -> np.ndarray:
+    """Grayscale photo-sized frame with the real ticket (tickets.ticket_image) at a random position"""
+    ticket = ticket_image({"ID": ticket_id}, module_px=module_px)
+    h, w = CANVAS
+    frame = np.full((h, w), 200, np.uint8)  # light grey background, not paper white
+    th, tw = ticket.shape
+    th, tw = min(th, h), min(tw, w)
+    y = int(rng.integers(0, h - th + 1))
+    x = int(rng.integers(0, w - tw + 1))
+    frame[y:y + th, x:x + tw] = ticket[:th, :tw]
+    return frame
+
+
+def rotate(frame, rng, degrees=25):
+    h, w = frame.shape
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), float(rng.uniform(-degrees, degrees)), 1.0)
+    return cv2.warpAffine(frame, m, (w, h), borderValue=200)
+
+
+def perspective(frame, rng, amount=0.12):
+    h, w = frame.shape
+    src = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    jitter = rng.uniform(-amount, amount, (4, 2)) * [w, h]
+    m = cv2.getPerspectiveTransform(src, np.float32(src + jitter))
+    return cv2.warpPerspective(frame, m, (w, h), borderValue=200)
+
+
+def blur(frame, rng, sigma=2.5):
+    return cv2.GaussianBlur(frame, (0, 0), sigma)
+
+
+def noise(frame, rng, sigma=25):
+    noisy = frame.astype(np.float32) + rng.normal(0, sigma, frame.shape)
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def jpeg(frame, rng, quality=20):
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return cv2.imdecode(buf, cv2.IMREAD_GRAYSCALE)
+
+
+def low_res(frame, rng, size=320):
+    h, w = frame.shape
+    scale = size / max(h, w)
+    return cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+# distortion name -> (QR module size in px, transforms applied in order)
+DISTORTIONS = {
+    "clean": (8, []),
+    "small_code": (2, []),
+    "low_res": (8, [low_res]),
+    "blur": (6, [blur]),
+    "rotation": (6, [rotate]),
+    "perspective": (6, [perspective]),
+    "noise": (6, [noise]),
+    "jpeg_q20": (6, [jpeg]),
+    "combined": (4, [rotate, perspective, blur, noise, jpeg]),
+}
+
+
+def build_corpus(ids, distortions, seed: int = 0) -> list:
+    """[(ticket_id, distortion, frame)] with a fixed seed so runs are comparable"""
+    rng = np.random.default_rng(seed)
+    corpus = []
+    for ticket_id in ids:
+        for name in distortions:
+            module_px, transforms = DISTORTIONS[name]
+            frame = render_ticket(ticket_id, module_px, rng)
+            for transform in transforms:
+                frame = transform(frame, rng)
+            corpus.append((ticket_id, name, frame))
+    return corpus
+
+
+# --- Harness ---
+
+def run(corpus, configs, budget_ms: float, repeat: int = 1) -> list:
+    """Decode every image with every config; one result row per (config, image, repeat)"""
+    rows = []
+    for config in configs:
+        stages = CONFIGS[config]
+        decode_cascade(corpus[0][2], stages=stages, budget_ms=budget_ms)  # warm-up
+        for ticket_id, distortion, frame in corpus:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                values, stage = decode_cascade(frame, stages=stages, budget_ms=budget_ms)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                rows.append({
+                    "config": config,
+                    "distortion": distortion,
+                    "ticket_id": ticket_id,
+                    "ok": ticket_id in values,
+                    "stage": stage,
+                    "ms": elapsed_ms,
+                })
+    return rows
+
+
+def summarize(rows) -> list:
+    """Success rate and latency percentiles per (config, distortion), plus an "all" row per config"""
+    groups = {}
+    for r in rows:
+        groups.setdefault((r["config"], r["distortion"]), []).append(r)
+        groups.setdefault((r["config"], "all"), []).append(r)
+    summary = []
+    for (config, distortion), group in groups.items():
+        ms = np.array([r["ms"] for r in group])
+        summary.append({
+            "config": config,
+            "distortion": distortion,
+            "n": len(group),
+            "success": sum(r["ok"] for r in group) / len(group),
+            "p50": np.percentile(ms, 50),
+            "p90": np.percentile(ms, 90),
+            "p99": np.percentile(ms, 99),
+            "max": ms.max(),
+        })
+    return summary
+
+
+def print_summary(summary):
+    print(f"{'config':<18}{'distortion':<14}{'n':>6}{'success':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for s in summary:
+        print(
+            f"{s['config']:<18}{s['distortion']:<14}{s['n']:>6}{s['success']:>9.1%}"
+            f"{s['p50']:>9.1f}{s['p90']:>9.1f}{s['p99']:>9.1f}{s['max']:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark QR decoding on a synthetic ticket corpus")
+    parser.add_argument("--entries", default="ENTRY*.xlsx", help="glob of entry lists to take ticket IDs from")
+    parser.add_argument("--limit", type=int, default=0, help="use at most this many IDs (0 = all)")
+    parser.add_argument("--config", action="append", choices=sorted(CONFIGS), help="decoder config (repeatable, default all)")
+    parser.add_argument("--distortion", action="append", choices=list(DISTORTIONS), help="distortion (repeatable, default all)")
+    parser.add_argument("--budget-ms", type=float, default=DECODE_BUDGET_MS, help="per-frame cascade budget")
+    parser.add_argument("--repeat", type=int, default=1, help="decodes per image, for steadier timings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="write per-image results to this CSV file")
+    parser.add_argument("--save-corpus", help="write the generated images to this directory")
+    args = parser.parse_args()
+
+    ids = load_ticket_ids(args.entries)
+    if args.limit:
+        ids = ids[: args.limit]
+    if not ids:
+        parser.error(f"no ticket IDs found in {args.entries}")
+
+    corpus = build_corpus(ids, args.distortion or list(DISTORTIONS), args.seed)
+    print(f"{len(corpus)} images from {len(ids)} ticket IDs")
+
+    if args.save_corpus:
+        os.makedirs(args.save_corpus, exist_ok=True)
+        for i, (ticket_id, distortion, frame) in enumerate(corpus):
+            cv2.imwrite(os.path.join(args.save_corpus, f"{i:05d}_{distortion}_{ticket_id}.png"), frame)
+
+    rows = run(corpus, args.config or list(CONFIGS), args.budget_ms, args.repeat)
+    print_summary(summarize(rows))
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Attendance storage benchmark.
+
+Drives the same gate workload through each storage backend (see storage.py):
+load the main list, then a stream of scans, mostly new tickets, some repeats
+and unknown codes, partly as group scans. It finishes with a delete and an
+export. It reports latency percentiles per operation and check-in
+throughput, to pick a backend per event size.
+
+The attendance target is CLEARED before and after the run, so point it at a
+scratch sheet/table. Nothing is cleared without --clear, except the
+temporary CSV used by default.
+
+    python bench_storage.py --backend csv --main ENTRY.xlsx
+    python bench_storage.py --backend sheets --main SHEET_ID --attendance SCRATCH_SHEET_ID \\
+        --service-account service_account.json --clear --scans 200
+    python bench_storage.py --backend supabase --url URL --key KEY \\
+        --main Main_RockIndie --attendance Att_Bench --clear
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from storage import open_storage
+
+
+def workload(ids: list, scans: int, repeat_rate: float, unknown_rate: float, group_rate: float,
+             group_size: int, seed: int = 0) -> list:
+    """List of scans, each a list of values (more than one = group scan)"""
+    rng = random.Random(seed)
+    fresh = ids[:]
+    rng.shuffle(fresh)
+    seen, out = [], []
+    for _ in range(scans):
+        size = group_size if rng.random() < group_rate else 1
+        scan = []
+        for _ in range(size):
+            roll = rng.random()
+            if roll < unknown_rate:
+                scan.append(f"UNKNOWN{rng.randrange(10 ** 6)}")
+            elif (roll < unknown_rate + repeat_rate and seen) or not fresh:
+                scan.append(rng.choice(seen) if seen else f"UNKNOWN{rng.randrange(10 ** 6)}")
+            else:
+                value = fresh.pop()
+                seen.append(value)
+                scan.append(value)
+        out.append(scan)
+    return out
+
+
+def timed(samples: dict, op: str, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    samples.setdefault(op, []).append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def run(storage, args) -> dict:
+    samples = {}
+    storage.clear()
+    main = timed(samples, "load_main_list", storage.load_main_list)
+    ids = [str(v) for v in main["ID"].tolist() if str(v).strip()]
+    if not ids:
+        raise SystemExit("Main list is empty.")
+    timed(samples, "load_attendance", storage.present_ids)
+
+    scans = workload(ids, args.scans, args.repeat_rate, args.unknown_rate, args.group_rate,
+                     args.group_size, args.seed)
+    statuses = []
+    start = time.perf_counter()
+    for scan in scans:
+        op = "check_in_group" if len(scan) > 1 else "check_in"
+        statuses.extend(timed(samples, op, storage.check_in, scan))
+    elapsed = time.perf_counter() - start
+
+    values = [v for scan in scans for v in scan]
+    created = [v for v, s in zip(values, statuses) if s == "created"]
+    if created:
+        timed(samples, "delete", storage.delete, created[0])
+    exported = timed(samples, "export", storage.export)
+    storage.clear()
+    return {
+        "samples": samples,
+        "scans": len(scans),
+        "tickets": len(statuses),
+        "created": statuses.count("created"),
+        "exported": len(exported),
+        "elapsed": elapsed,
+    }
+
+
+def print_report(backend: str, result: dict):
+    print(f"\n== {backend}: {result['scans']} scans / {result['tickets']} tickets, "
+          f"{result['created']} checked in, {result['exported']} rows exported")
+    print(f"   check-in throughput: {result['tickets'] / result['elapsed']:.1f} tickets/s "
+          f"({result['scans'] / result['elapsed']:.1f} scans/s)")
+    print(f"   {'operation':<16}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for op, ms in result["samples"].items():
+        ms = np.array(ms)
+        print(f"   {op:<16}{len(ms):>6}{np.percentile(ms, 50):>10.1f}{np.percentile(ms, 90):>10.1f}"
+              f"{np.percentile(ms, 99):>10.1f}{ms.max():>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark attendance storage backends on one scan workload")
+    parser.add_argument("--backend", action="append", choices=["csv", "sheets", "supabase"],
+                        help="backend to run (repeatable, default csv)")
+    parser.add_argument("--main", default="ENTRY.xlsx", help="main list: file (csv), sheet ID or table")
+    parser.add_argument("--attendance", help="attendance target: CSV path, sheet ID or table (csv: a temp file)")
+    parser.add_argument("--url", default=os.environ.get("SUPABASE_URL"))
+    parser.add_argument("--key", default=os.environ.get("SUPABASE_KEY"))
+    parser.add_argument("--service-account", default="service_account.json")
+    parser.add_argument("--scans", type=int, default=500)
+    parser.add_argument("--repeat-rate", type=float, default=0.2, help="share of scans repeating a ticket")
+    parser.add_argument("--unknown-rate", type=float, default=0.05, help="share of unknown codes")
+    parser.add_argument("--group-rate", type=float, default=0.1, help="share of group scans")
+    parser.add_argument("--group-size", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clear", action="store_true", help="allow clearing a remote attendance target")
+    args = parser.parse_args()
+
+    for backend in args.backend or ["csv"]:
+        if backend == "csv":
+            if args.attendance and not args.clear:
+                parser.error("an existing --attendance CSV is cleared, pass --clear to allow it")
+            attendance = args.attendance or os.path.join(tempfile.mkdtemp(), "bench_attendance.csv")
+            config = {"backend": "csv", "main": args.main, "attendance": attendance}
+        else:
+            if not args.attendance or not args.clear:
+                parser.error(f"{backend} needs --attendance (a scratch target) and --clear")
+            config = {"backend": backend, "main": args.main, "attendance": args.attendance}
+            if backend == "sheets":
+                config["service_account"] = args.service_account
+            else:
+                config.update(url=args.url, key=args.key)
+        print_report(backend, run(open_storage(config), args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import asyncio
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+class AttendanceFeed:
+    """
+    Live copy of one attendance table, kept current by insert/delete events.
+
+    Rows are keyed by ticket ID. `version` goes up on every change so callers
+    can cheaply tell whether their DataFrame is stale. `connected` is False
+    until a subscription is up and resync() has reloaded the table (and again
+    if it drops), which tells callers to fall back to polling.
+    """
+
+    def __init__(self, columns=("Name", "Matric", "ID")):
+        self.columns = list(columns)
+        self.version = 0
+        self.connected = False
+        self._rows = OrderedDict()  # ticket ID -> row
+        self._pk = {}               # table primary key ("id") -> ticket ID, for deletes
+        self._lock = threading.Lock()
+        self._frame = (None, None)  # (version, DataFrame)
+        self._held = None  # events that arrive during resync(), replayed after it
+
+    def reset(self, rows):
+        """Replace the whole state, e.g. after the initial full load"""
+        with self._lock:
+            self._reset(rows)
+
+    def resync(self, load):
+        """
+        Full reload with load() after (re)subscribing, as events missed while
+        disconnected are gone. Events arriving during the load are held back and
+        replayed on top of it, so none is lost. Marks the feed connected; if
+        load() raises, it stays disconnected and the error is raised.
+        """
+        with self._lock:
+            self._held = []
+        try:
+            rows = load()
+        except Exception:
+            with self._lock:
+                self._held = None
+            raise
+        with self._lock:
+            held, self._held = self._held, None
+            self._reset(rows)
+            for change in held:
+                self._apply(*change)
+            self.connected = True
+
+    def apply(self, event: str, record: dict = None, old_record: dict = None):
+        """Apply one change: event is "INSERT", "UPDATE", "DELETE" or "CLEAR" """
+        with self._lock:
+            if self._held is not None:
+                self._held.append((event, record, old_record))
+            else:
+                self._apply(event, record, old_record)
+
+    def apply_payload(self, payload: dict):
+        """Apply a Supabase Realtime postgres_changes payload"""
+        data = payload.get("data", payload)
+        event = data.get("type") or data.get("eventType") or ""
+        self.apply(event, data.get("record") or data.get("new"), data.get("old_record") or data.get("old"))
+
+    def has(self, ticket_id) -> bool:
+        with self._lock:
+            return str(ticket_id) in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Current attendance as a DataFrame, rebuilt only when something changed"""
+        with self._lock:
+            version, frame = self._frame
+            if version != self.version:
+                frame = pd.DataFrame(list(self._rows.values()), columns=self.columns)
+                self._frame = (self.version, frame)
+            return frame
+
+    def _reset(self, rows):
+        self._rows.clear()
+        self._pk.clear()
+        for row in rows:
+            self._put(row)
+        self.version += 1
+
+    def _apply(self, event: str, record: dict = None, old_record: dict = None):
+        event = event.upper()
+        if event == "CLEAR":
+            self._rows.clear()
+            self._pk.clear()
+        elif event in ("INSERT", "UPDATE") and record:
+            self._put(record)
+        elif event == "DELETE":
+            self._delete(old_record or record or {})
+        else:
+            return
+        self.version += 1
+
+    def _put(self, row: dict):
+        ticket_id = str(row.get("ID"))
+        self._rows[ticket_id] = {c: row.get(c) for c in self.columns}
+        if row.get("id") is not None:
+            self._pk[row["id"]] = ticket_id
+
+    def _delete(self, old: dict):
+        # without REPLICA IDENTITY FULL a delete only carries the primary key
+        ticket_id = self._pk.pop(old.get("id"), None) if old.get("id") is not None else None
+        keys = {str(v) for v in (ticket_id, old.get("ID"), old.get("Matric")) if v is not None}
+        for k, row in list(self._rows.items()):
+            if k in keys or str(row.get("Matric")) in keys:
+                del self._rows[k]
+
+
+class LocalChangeFeed:
+    """In-process stand-in for Supabase Realtime, used to test without a backend"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, table: str, callback):
+        with self._lock:
+            self._subscribers.setdefault(table, []).append(callback)
+
+    def unsubscribe(self, table: str, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(table, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def publish(self, table: str, event: str, record: dict = None, old_record: dict = None):
+        with self._lock:
+            callbacks = list(self._subscribers.get(table, []))
+        for callback in callbacks:
+            callback(event, record, old_record)
+
+
+def subscribe_realtime(url: str, key: str, table: str, feed: AttendanceFeed, load, schema: str = "public"):
+    """
+    Feed postgres_changes for `table` into `feed` from a background thread.
+    Every (re)subscribe reloads the table with load() (see AttendanceFeed.resync),
+    so changes missed during an outage don't stay missing.
+    Needs the table in the supabase_realtime publication; for deletes to carry
+    more than the primary key, also `alter table ... replica identity full`.
+    """
+    from supabase import acreate_client
+
+    subscribed = threading.Event()
+
+    def resync():
+        try:
+            feed.resync(load)
+        except Exception:
+            return  # stays disconnected (callers poll) until the next subscribe
+        if not subscribed.is_set():
+            feed.connected = False  # dropped again while reloading
+
+    def on_status(status, err=None):
+        if str(status).upper().split(".")[-1] == "SUBSCRIBED":  # e.g. RealtimeSubscribeStates.SUBSCRIBED
+            subscribed.set()
+            # the reload is a blocking request, keep it off the event loop
+            threading.Thread(target=resync, name=f"realtime-resync-{table}", daemon=True).start()
+        else:
+            subscribed.clear()
+            feed.connected = False
+
+    async def listen():
+        client = await acreate_client(url, key)
+        channel = client.channel(f"attendance-{table}")
+        channel.on_postgres_changes("*", schema=schema, table=table, callback=feed.apply_payload)
+        await channel.subscribe(on_status)
+        while True:
+            await asyncio.sleep(3600)
+
+    def run():
+        try:
+            asyncio.run(listen())
+        finally:
+            feed.connected = False
+
+    thread = threading.Thread(target=run, name=f"realtime-{table}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,206 @@
+import sqlite3
+import threading
+import time
+
+
+class CheckinJournal:
+    """
+    Local SQLite (WAL) journal of check-ins for one gate server.
+
+    Every check-in is written here first, keyed by (event, ticket ID). Rows stay
+    "pending" until the backend has accepted them; replay() pushes pending rows
+    in batches once the network is back. Only pending rows count as duplicates
+    here: once synced, the backend (or its synced copy) is the judge, so a
+    check-in deleted there by another gate or by hand can be admitted again.
+    A snapshot of the main list is kept too, so tickets can still be validated
+    while the backend is unreachable.
+    `event` is whatever identifies the attendance store (table name, sheet ID).
+    """
+
+    def __init__(self, path: str = "checkins.db"):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self.last_failure = {}  # event -> (time, exception) of the last failed backend request
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS checkins (
+                    event TEXT NOT NULL,
+                    ticket_id TEXT NOT NULL,
+                    name TEXT,
+                    matric TEXT,
+                    created_at REAL NOT NULL,
+                    synced INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (event, ticket_id)
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS checkins_pending ON checkins (event, synced, created_at)"
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS main_list (
+                    event TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    name TEXT,
+                    matric TEXT,
+                    ticket_id TEXT,
+                    PRIMARY KEY (event, position)
+                )"""
+            )
+
+    # --- check-ins ---
+
+    def record(self, event: str, row: dict) -> bool:
+        """Journal a check-in, returns False if this ticket is already pending"""
+        with self._lock:
+            # a synced row is replaced by a new pending one
+            cur = self._conn.execute(
+                "INSERT INTO checkins (event, ticket_id, name, matric, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (event, ticket_id) DO UPDATE SET name = excluded.name, matric = excluded.matric, "
+                "created_at = excluded.created_at, synced = 0 WHERE checkins.synced = 1",
+                (event, str(row["ID"]), _text(row.get("Name")), _text(row.get("Matric")), time.time()),
+            )
+            return cur.rowcount == 1
+
+    def mark_synced(self, event: str, ticket_ids):
+        """Flag check-ins as accepted by the backend"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE checkins SET synced = 1 WHERE event = ? AND ticket_id = ?",
+                [(event, str(t)) for t in ticket_ids],
+            )
+
+    def pending(self, event: str, limit: int = 500) -> list:
+        """Oldest check-ins not yet accepted by the backend"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, matric, ticket_id FROM checkins WHERE event = ? AND synced = 0 "
+                "ORDER BY created_at LIMIT ?",
+                (event, limit),
+            ).fetchall()
+        return [{"Name": n, "Matric": m, "ID": t} for n, m, t in rows]
+
+    def pending_count(self, event: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM checkins WHERE event = ? AND synced = 0", (event,)
+            ).fetchone()[0]
+
+    def replay(self, event: str, push_fn, batch_size: int = 200, skip=(), retry: float = 0) -> int:
+        """
+        Push pending check-ins to the backend in batches with push_fn(rows).
+        Stops at the first failed batch (left pending for the next replay).
+        Tickets in `skip` are left alone, e.g. rows already queued elsewhere.
+        Nothing is tried while the backend failed less than `retry` seconds ago,
+        so a rerun isn't stalled by a backend known to be down.
+        Returns the number of rows replayed.
+        """
+        if self.offline(event, retry=retry):
+            return 0
+        replayed = 0
+        while True:
+            rows = [r for r in self.pending(event, batch_size + len(skip)) if r["ID"] not in skip]
+            rows = rows[:batch_size]
+            if not rows:
+                return replayed
+            try:
+                push_fn(rows)
+            except Exception as e:
+                self.failed(event, e)
+                return replayed
+            self.recovered(event)
+            self.mark_synced(event, [r["ID"] for r in rows])
+            replayed += len(rows)
+            if len(rows) < batch_size:
+                return replayed
+
+    def failed(self, event: str, error):
+        """Note that the backend for `event` just failed (see offline())"""
+        self.last_failure[event] = (time.time(), error)
+
+    def recovered(self, event: str):
+        self.last_failure.pop(event, None)
+
+    def offline(self, *events, retry: float = 30) -> bool:
+        """
+        True if the backend failed for any of `events` (for any event at all if
+        none are given) less than `retry` seconds ago
+        """
+        now = time.time()
+        failures = [self.last_failure.get(e) for e in events] if events else list(self.last_failure.values())
+        return any(f is not None and now - f[0] < retry for f in failures)
+
+    def delete(self, event: str, value: str):
+        """Forget a check-in by ticket ID or Matric (after it was deleted from attendance)"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM checkins WHERE event = ? AND (lower(ticket_id) = lower(?) OR lower(matric) = lower(?))",
+                (event, str(value), str(value)),
+            )
+
+    def clear(self, event: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM checkins WHERE event = ?", (event,))
+
+    # --- main list snapshot ---
+
+    def save_main_list(self, event: str, rows):
+        """Replace the offline copy of the main list with (Name, Matric, ID) rows"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM main_list WHERE event = ?", (event,))
+                self._conn.executemany(
+                    "INSERT INTO main_list (event, position, name, matric, ticket_id) VALUES (?, ?, ?, ?, ?)",
+                    ((event, i, _text(n), _text(m), _text(t)) for i, (n, m, t) in enumerate(rows)),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load_main_list(self, event: str) -> list:
+        """Offline copy of the main list as (Name, Matric, ID) tuples"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT name, matric, ticket_id FROM main_list WHERE event = ? ORDER BY position", (event,)
+            ).fetchall()
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def open_journal(path: str = "checkins.db") -> CheckinJournal:
+    """One journal per file for the whole server process (every session and page shares it)"""
+    with _journals_lock:
+        if path not in _journals:
+            _journals[path] = CheckinJournal(path)
+        return _journals[path]
+
+
+def backlog_status(journal: CheckinJournal, event: str, queue=None, backend: str = "the backend") -> list:
+    """
+    Operator notes on check-ins not written to the backend yet: the pending
+    count, since when it is unreachable and the write-behind queue's retrying
+    and refused rows. Empty when everything is written.
+    """
+    pending = journal.pending_count(event)
+    refused = list(queue.rejected) if queue is not None else []
+    if not pending and not refused:
+        return []
+    lines = [f"⏳ {pending} check-in(s) waiting to sync to {backend}"]
+    failed = journal.last_failure.get(event)
+    if failed:
+        lines.append(f"📴 Offline since {time.strftime('%H:%M:%S', time.localtime(failed[0]))}: {failed[1]}")
+    if queue is not None and queue.last_error is not None:
+        lines.append(f"⚠ Last sync failed, retrying: {queue.last_error}")
+    if refused:
+        row, error = refused[-1]
+        lines.append(f"❌ {len(refused)} check-in(s) refused by {backend}, last {row['ID']}: {error}")
+    return lines
@@ -0,0 +1,156 @@
+import atexit
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class WriteBehindQueue:
+    """
+    Collects check-in rows and writes them in bulk from a background thread.
+
+    A flush happens every `interval_ms`, or sooner once `max_rows` are waiting.
+    Durability: rows are acknowledged to the operator before they reach the
+    backend, so anything still queued is lost if the server process dies.
+    A batch failing with an error `retryable(error)` accepts (network down,
+    rate limited) stays at the front of the queue and is retried on the next
+    cycle. Any other error means the backend refused the rows: the batch is
+    split in halves until the refused rows are isolated, those are handed to
+    on_reject(row, error) and kept in `rejected`, and the rest is written, so
+    one bad row can't hold up every check-in queued behind it.
+    close() (also run at exit) makes a final flush. Rows whose check-ins are
+    deleted before they are written must be discard()ed, or the flush would
+    bring them back.
+    """
+
+    def __init__(self, flush_fn, interval_ms: int = 500, max_rows: int = 200, key: str = "ID",
+                 retryable=None, on_reject=None):
+        self._flush_fn = flush_fn  # called with a list of rows, raises on failure
+        self._interval = interval_ms / 1000
+        self._max_rows = max_rows
+        self._key = key
+        self._retryable = retryable or (lambda error: True)
+        self._on_reject = on_reject
+        self._pending = OrderedDict()  # key -> row, so repeated scans are queued once
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.flushed = 0
+        self.last_error = None  # last retryable failure, cleared by the next successful flush
+        self.rejected = deque(maxlen=100)  # (row, error) refused by the backend, newest last
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, row: dict) -> bool:
+        """Queue a row, returns False if a row with the same key is already waiting"""
+        k = str(row[self._key])
+        with self._lock:
+            if k in self._pending or k in self._inflight:
+                return False
+            self._pending[k] = row
+            full = len(self._pending) >= self._max_rows
+        if full:
+            self._wake.set()
+        return True
+
+    def __contains__(self, key) -> bool:
+        k = str(key)
+        with self._lock:
+            return k in self._pending or k in self._inflight
+
+    def keys(self) -> set:
+        """Keys of every row not yet written"""
+        with self._lock:
+            return set(self._pending) | set(self._inflight)
+
+    def backlog(self) -> int:
+        """Number of acknowledged rows not yet written to the backend"""
+        with self._lock:
+            return len(self._pending) + len(self._inflight)
+
+    def discard(self, match=None) -> int:
+        """
+        Drop queued rows (all, or those where match(row) is true) so they are never
+        written. Waits for a running flush, so no matching row is in flight after.
+        Returns the number of rows dropped.
+        """
+        with self._flush_lock, self._lock:
+            keys = [k for k, row in self._pending.items() if match is None or match(row)]
+            for k in keys:
+                del self._pending[k]
+        return len(keys)
+
+    def flush(self) -> int:
+        """Write everything queued right now, returns the number of rows written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    keys = list(self._pending)[: self._max_rows]
+                    if not keys:
+                        self.last_error = None  # nothing left that could still fail
+                        return written
+                    batch = {k: self._pending.pop(k) for k in keys}
+                    self._inflight.update(batch)
+                done, rejected, left = self._write(list(batch.values()))
+                with self._lock:
+                    for k in batch:
+                        self._inflight.pop(k, None)
+                    if left:
+                        # put the unwritten rows back in front of anything queued since
+                        self._pending = OrderedDict(
+                            [(str(r[self._key]), r) for r in left] + list(self._pending.items())
+                        )
+                self.flushed += len(done)
+                written += len(done)
+                for row, error in rejected:
+                    self.rejected.append((row, error))
+                    if self._on_reject is not None:
+                        self._on_reject(row, error)
+                if left:
+                    return written
+                self.last_error = None
+
+    def _write(self, rows: list):
+        """
+        flush_fn(rows), halving a refused batch until the refused rows are found.
+        Returns (rows written, [(row, error)] refused, rows left for a retry after
+        a retryable error, which is kept in last_error).
+        """
+        done, rejected = [], []
+        todo = [rows]
+        while todo:
+            part = todo.pop()
+            try:
+                self._flush_fn(part)
+            except Exception as e:
+                if self._retryable(e):
+                    self.last_error = e
+                    return done, rejected, part + [r for p in reversed(todo) for r in p]
+                if len(part) == 1:
+                    rejected.append((part[0], e))
+                else:
+                    half = len(part) // 2
+                    todo += [part[half:], part[:half]]
+                continue
+            done += part
+        return done, rejected, []
+
+    def close(self):
+        """Stop the worker and flush what is left"""
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            start = time.monotonic()
+            self.flush()
+            if self.last_error is not None:
+                # back off a little so a dead backend isn't hammered
+                time.sleep(max(0.0, self._interval * 4 - (time.monotonic() - start)))
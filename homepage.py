@@ -3,9 +3,26 @@ import pandas as pd
 from io import BytesIO
 import os
 import time
-import cv2
-import numpy as np
-from PIL import Image
+from qrscan import SCANNER_IDLE_TIMEOUT, decode_all_qr_pooled, FrameScanner, session_dedup, camera_scanner
+from tickets import TicketError, read_ticket
+try:
+    from streamlit_webrtc import webrtc_streamer
+except ImportError:  # live stream mode needs streamlit-webrtc
+    webrtc_streamer = None
+
+# Server-side camera index or video file for the "Server camera" scan mode (e.g. a
+# webcam on the gate laptop running the app, or a recorded clip for testing)
+SERVER_CAMERA = os.environ.get("SERVER_CAMERA", "")
+if SERVER_CAMERA.isdigit():
+    SERVER_CAMERA = int(SERVER_CAMERA)
+
+SCAN_MODES = ["📸 Snapshot"]
+if webrtc_streamer is not None:
+    SCAN_MODES.append("🎥 Live stream")
+if SERVER_CAMERA != "":
+    SCAN_MODES.append("🖥 Server camera")
+
+
 
 def system(Title, password, file, csv):
     
@@ -100,18 +117,17 @@ def system(Title, password, file, csv):
         else:
             st.session_state.attendance = pd.DataFrame(columns=required_columns)
 
-    # --- QR Decode using OpenCV (no zbar needed) ---
-    def decode_qr_from_image(image: Image.Image) -> str:
-        arr = np.array(image.convert("RGB"))
-        detector = cv2.QRCodeDetector()
-        data, _, _ = detector.detectAndDecode(arr)
-        return data or ""
-
     # --- Handle query params safely ---
     params = st.query_params  # new API replacing experimental_get_query_params
 
     # --- Function to mark attendance ---
-    def mark_attendance(entered_val: str):
+    def mark_attendance(entered_val: str, scanned: bool = False):
+        try:
+            # signed tickets are checked before any lookup; typed values may be a Matric
+            entered_val = read_ticket(entered_val, Title, require_signed=None if scanned else False)
+        except TicketError as e:
+            st.session_state.message = f"🚫 {e}"
+            return
         entered_value = str(entered_val).strip().lower()
         if not entered_value:
             st.session_state.message = "❌ Empty input."
@@ -136,6 +152,44 @@ def system(Title, password, file, csv):
         else:
             st.session_state.message = "❌ No record found with that ID or Matric."
 
+    # --- Group check-in: every ticket in one frame, one lookup and one write ---
+    def mark_attendance_many(entered_vals):
+        lines, verified = [], []
+        for entered in entered_vals:
+            try:
+                verified.append(read_ticket(entered, Title))
+            except TicketError as e:
+                lines.append(f"🚫 {entered}: {e}")
+        entered_vals = verified
+        keys = [str(v).strip().lower() for v in entered_vals]
+        ids = df["ID"].astype(str).str.lower()
+        matrics = df["Matric"].astype(str).str.lower()
+        matches = df[ids.isin(keys) | matrics.isin(keys)]
+        by_key = {}
+        for pos in range(len(matches)):
+            by_key.setdefault(ids[matches.index[pos]], pos)
+            by_key.setdefault(matrics[matches.index[pos]], pos)
+        present = set(st.session_state.attendance["ID"].astype(str).str.lower())
+        new_positions = []
+        for entered, k in zip(entered_vals, keys):
+            pos = by_key.get(k)
+            if pos is None:
+                lines.append(f"❌ {entered}: no record found.")
+                continue
+            row = matches.iloc[pos]
+            student_id = str(row["ID"]).lower()
+            if student_id in present:
+                lines.append(f"⚠ {row['Name']} is already marked present.")
+            else:
+                present.add(student_id)
+                new_positions.append(pos)
+                lines.append(f"✅ {row['Name']} marked present!")
+        if new_positions:
+            new_rows = matches.iloc[new_positions]
+            st.session_state.attendance = pd.concat([st.session_state.attendance, new_rows], ignore_index=True)
+            new_rows.to_csv(persistent_file, mode="a", header=not os.path.exists(persistent_file), index=False)
+        st.session_state.message = "  \n".join(lines)
+
     # --- Manual Input Section ---
     st.subheader("📝 Manual Entry")
     if "entered_temp" not in st.session_state:
@@ -149,6 +203,54 @@ def system(Title, password, file, csv):
     if "message" in st.session_state:
         st.info(st.session_state.message)
 
+    # --- Live scanning (no snapshot + rerun per ticket) ---
+    def stop_live_scan():
+        scanner = st.session_state.pop("scanner", None)
+        # the server camera scanner is shared by every session, it stops once nobody reads it
+        if scanner is not None and st.session_state.get("scanner_mode") != "🖥 Server camera":
+            scanner.stop()
+        st.session_state.pop("scanner_mode", None)
+
+    def live_scan(scan_mode):
+        """Frames are decoded on a background worker; a fragment polls the results every 0.5s"""
+        if st.session_state.get("scanner_mode") != scan_mode or not st.session_state.scanner.running:
+            stop_live_scan()
+            if scan_mode == "🖥 Server camera":
+                st.session_state.scanner = camera_scanner(SERVER_CAMERA)
+            else:
+                # stops by itself if the session goes away without switching modes
+                st.session_state.scanner = FrameScanner(idle_timeout=SCANNER_IDLE_TIMEOUT)
+            st.session_state.scanner_mode = scan_mode
+        scanner = st.session_state.scanner
+
+        if scan_mode == "🎥 Live stream":
+            def on_frame(frame):
+                scanner.submit(frame.to_ndarray(format="gray"))
+                return frame
+
+            webrtc_streamer(
+                key="qr-live",
+                video_frame_callback=on_frame,
+                media_stream_constraints={"video": True, "audio": False},
+            )
+
+        @st.fragment(run_every=0.5)
+        def scan_results():
+            qr_values = scanner.events()
+            if len(qr_values) > 1:
+                mark_attendance_many(qr_values)
+            elif qr_values:
+                mark_attendance(qr_values[0], scanned=True)
+            if qr_values:
+                st.session_state.last_qr = ", ".join(qr_values)
+            if st.session_state.get("last_qr"):
+                st.success(f"QR scanned: {st.session_state.last_qr}")
+            if "message" in st.session_state:
+                st.info(st.session_state.message)
+            st.caption(f"Frames decoded: {scanner.frames}")
+
+        scan_results()
+
     # --- Auto QR Scan section ---
     st.subheader("QR Scan")
 
@@ -163,23 +265,39 @@ def system(Title, password, file, csv):
         if st.button("▶ Start Auto Scan"):
             st.session_state.auto_scan = True
             st.session_state.last_qr = ""
+            session_dedup(st.session_state).clear()
             st.query_params["page"] = "scan"  # replaces experimental_set_query_params
     with col2:
         if st.button("⏹ Stop Auto Scan"):
             st.session_state.auto_scan = False
             st.query_params["page"] = "home"
 
-    if st.session_state.auto_scan:
+    scan_mode = "📸 Snapshot"
+    if st.session_state.auto_scan and len(SCAN_MODES) > 1:
+        scan_mode = st.radio("Scan mode", SCAN_MODES, horizontal=True, key="scan_mode_choice")
+    if not st.session_state.auto_scan or scan_mode == "📸 Snapshot":
+        stop_live_scan()
+    else:
+        live_scan(scan_mode)
+
+    if st.session_state.auto_scan and scan_mode == "📸 Snapshot":
         img = st.camera_input("Show QR Code to camera")
-        if img is not None:
+        # camera_input keeps returning the same photo on every rerun; only a new one is decoded
+        if img is not None and session_dedup(st.session_state).is_new_frame(img.getbuffer()):
             try:
-                pil_img = Image.open(img)
-                qr_value = decode_qr_from_image(pil_img)
-                if qr_value:
-                    if st.session_state.get("last_qr", "") != qr_value:
-                        st.session_state.last_qr = qr_value
-                        st.success(f"QR scanned: {qr_value}")
-                        mark_attendance(qr_value)
+                # decoded straight from the upload buffer (no PIL image, no copy)
+                qr_values = decode_all_qr_pooled(img.getbuffer())
+                if qr_values:
+                    scanned = ", ".join(qr_values)
+                    st.session_state.last_qr = scanned
+                    st.success(f"QR scanned: {scanned}")
+                    new_values = session_dedup(st.session_state).fresh(qr_values)
+                    if len(new_values) > 1:
+                        mark_attendance_many(new_values)
+                    elif new_values:
+                        mark_attendance(new_values[0], scanned=True)
+                    else:
+                        st.info("Already scanned just now.")
                 else:
                     st.info("No QR detected in the captured frame.")
             except Exception as e:
@@ -217,6 +335,7 @@ def system(Title, password, file, csv):
                 ].reset_index(drop=True)
                 after = len(st.session_state.attendance)
                 if after < before:
+                    session_dedup(st.session_state).clear()
                     st.success(f"Deleted record(s) matching '{val}'.")
                     if not st.session_state.attendance.empty:
                         st.session_state.attendance.to_csv(persistent_file, index=False)
@@ -237,6 +356,7 @@ def system(Title, password, file, csv):
         if st.button("🧹 Clear All") and st.session_state.clear_confirm:
             st.session_state.attendance = pd.DataFrame(columns=df.columns)
             pd.DataFrame(columns=required_columns).to_csv(persistent_file, index=False)
+            session_dedup(st.session_state).clear()
             st.success("Attendance list cleared.")
             st.session_state.clear_confirm = False  # ✅ auto reset
         # st.rerun()
@@ -0,0 +1,449 @@
+import atexit
+import hashlib
+from contextlib import contextmanager
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+
+try:  # optional stronger decoders for the end of the cascade
+    import zxingcpp
+except ImportError:
+    zxingcpp = None
+try:
+    from pyzbar import pyzbar
+except ImportError:
+    pyzbar = None
+
+# --- QR Decode using OpenCV (no zbar needed) ---
+# Shared by every gate page. Lives in its own module (not the Streamlit
+# scripts) so detectors survive reruns instead of being rebuilt per frame.
+
+TARGET_SIZE = 800  # longest side (px) of the frame used for the fast pass
+
+# Idle QRCodeDetectors, shared by every thread. OpenCV detectors aren't
+# thread-safe, so each one is lent to a single decode at a time; Streamlit runs
+# every rerun on a new thread, so per-thread detectors would be rebuilt per frame.
+_detectors = queue.LifoQueue()
+
+
+@contextmanager
+def borrow_detector():
+    """A QRCodeDetector for one decode, returned to the pool afterwards"""
+    try:
+        detector = _detectors.get_nowait()
+    except queue.Empty:
+        detector = cv2.QRCodeDetector()  # no more than the number of concurrent decodes
+    try:
+        yield detector
+    finally:
+        _detectors.put(detector)
+
+
+def to_gray(image) -> np.ndarray:
+    """Encoded image bytes, PIL image or RGB/BGR/gray array to a single-channel uint8 array"""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        # straight from the JPEG/PNG bytes to grayscale, no PIL image or RGB copy in between
+        gray = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError("Not a decodable image.")
+        return gray
+    if isinstance(image, np.ndarray):
+        if image.ndim == 3:
+            return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        return image
+    if image.mode != "L":
+        image = image.convert("L")  # straight to luminance, no full-size RGB copy
+    return np.asarray(image)
+
+
+def downscale(gray: np.ndarray, target_size: int = TARGET_SIZE) -> np.ndarray:
+    """Shrink so the longest side is target_size; smaller frames are returned as-is"""
+    h, w = gray.shape[:2]
+    scale = target_size / max(h, w)
+    if scale >= 1:
+        return gray
+    return cv2.resize(gray, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def decode_all_gray(gray: np.ndarray) -> list:
+    """Every QR code the detector finds in a grayscale frame, in order, without repeats"""
+    with borrow_detector() as detector:
+        ok, decoded, _, _ = detector.detectAndDecodeMulti(gray)
+    if not ok:
+        return []
+    return list(dict.fromkeys(d for d in decoded if d))
+
+
+# --- Decoder cascade (glare, small codes, cracked screens) ---
+# Stages run cheapest first until one finds a code or the per-frame budget is
+# spent; stages whose decoder isn't installed (zxing, pyzbar) are skipped.
+DECODE_STAGES = [
+    s.strip()
+    for s in os.environ.get("QR_DECODE_STAGES", "opencv,full_res,sharpen,adaptive,upscale,zxing,pyzbar").split(",")
+    if s.strip()
+]
+DECODE_BUDGET_MS = float(os.environ.get("QR_DECODE_BUDGET_MS", 300))
+
+stage_stats = {}  # winning stage ("" = nothing found) -> number of frames
+
+
+def sharpen(gray: np.ndarray) -> np.ndarray:
+    """Unsharp mask, for slightly blurred or out-of-focus codes"""
+    blurred = cv2.GaussianBlur(gray, (0, 0), 3)
+    return cv2.addWeighted(gray, 1.5, blurred, -0.5, 0)
+
+
+def adaptive_threshold(gray: np.ndarray) -> np.ndarray:
+    """Local binarisation, evens out glare and uneven lighting across the code"""
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 5)
+
+
+def _zxing_decode(gray: np.ndarray) -> list:
+    results = zxingcpp.read_barcodes(gray, formats=zxingcpp.BarcodeFormat.QRCode)
+    return list(dict.fromkeys(r.text for r in results if r.text))
+
+
+def _pyzbar_decode(gray: np.ndarray) -> list:
+    results = pyzbar.decode(gray, symbols=[pyzbar.ZBarSymbol.QRCODE])
+    return list(dict.fromkeys(r.data.decode("utf-8", "replace") for r in results if r.data))
+
+
+def _stage_passes(gray: np.ndarray, small: np.ndarray) -> dict:
+    """Stage name -> decode pass (None when it doesn't apply to this frame or isn't installed)"""
+    return {
+        "opencv": lambda: decode_all_gray(small),
+        "full_res": (lambda: decode_all_gray(gray)) if small is not gray else None,
+        "sharpen": lambda: decode_all_gray(sharpen(small)),
+        "adaptive": lambda: decode_all_gray(adaptive_threshold(small)),
+        # only worth it when the photo itself is small (a full-res pass covers big ones)
+        "upscale": (
+            (lambda: decode_all_gray(cv2.resize(small, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)))
+            if small is gray
+            else None
+        ),
+        "zxing": (lambda: _zxing_decode(gray)) if zxingcpp is not None else None,
+        "pyzbar": (lambda: _pyzbar_decode(gray)) if pyzbar is not None else None,
+    }
+
+
+def decode_cascade(image, target_size: int = TARGET_SIZE, stages=None, budget_ms: float = None) -> tuple:
+    """
+    Run the decoder stages in order until one finds a code or `budget_ms` is used up
+    (the first stage always runs). Returns (values, winning stage or "").
+    """
+    stages = DECODE_STAGES if stages is None else stages
+    budget = (DECODE_BUDGET_MS if budget_ms is None else budget_ms) / 1000
+    start = time.perf_counter()
+    gray = to_gray(image)
+    small = downscale(gray, target_size)
+    passes = _stage_passes(gray, small)
+    tried = False
+    for stage in stages:
+        run = passes.get(stage)
+        if run is None:
+            continue
+        if tried and time.perf_counter() - start > budget:
+            break
+        tried = True
+        values = run()
+        if values:
+            return values, stage
+    return [], ""
+
+
+def decode_qr_from_image(image, target_size: int = TARGET_SIZE) -> str:
+    """Decode QR code from image: fast pass on a downscaled frame, then the fallback cascade"""
+    values, _ = decode_cascade(image, target_size)
+    return values[0] if values else ""
+
+
+def decode_all_qr_from_image(image, target_size: int = TARGET_SIZE) -> list:
+    """Decode every QR code in the frame (group check-in), same cascade"""
+    return decode_cascade(image, target_size)[0]
+
+
+# --- Process pool (decodes from every gate session share the server's cores) ---
+# One pool per server process. QR_POOL_WORKERS=0 turns it off (inline decoding).
+POOL_WORKERS = int(os.environ.get("QR_POOL_WORKERS", os.cpu_count() or 1))
+POOL_QUEUE = int(os.environ.get("QR_POOL_QUEUE", POOL_WORKERS * 2))  # jobs queued or running
+POOL_TIMEOUT = float(os.environ.get("QR_POOL_TIMEOUT", 3.0))  # seconds per job
+
+pool_stats = {"pooled": 0, "inline": 0, "timeouts": 0}
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(max(POOL_QUEUE, 1))
+
+
+def get_pool():
+    """The shared decode pool, started on first use (None when disabled)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None and POOL_WORKERS > 0:
+            # spawn, not fork: the Streamlit server is multi-threaded
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _drop_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _cascade(image, target_size, timeout) -> tuple:
+    encoded = isinstance(image, (bytes, bytearray, memoryview))
+    if not encoded:
+        image = to_gray(image)  # workers only get the single-channel frame to unpickle
+    pool = get_pool()
+    if pool is None or not _pool_slots.acquire(blocking=False):
+        # pool off or saturated: decode here rather than queue behind other gates,
+        # a compressed frame straight from the caller's buffer
+        pool_stats["inline"] += 1
+        return decode_cascade(image, target_size)
+    # ship the compressed frame, the worker decodes it (a memoryview can't be
+    # pickled, so it is copied here and only here)
+    job = bytes(image) if encoded else image
+    try:
+        future = pool.submit(decode_cascade, job, target_size)
+    except (BrokenProcessPool, RuntimeError):
+        _pool_slots.release()
+        _drop_pool(pool)
+        pool_stats["inline"] += 1
+        return decode_cascade(image, target_size)
+    # the slot is held until the job really finishes, even after a timeout
+    future.add_done_callback(lambda _: _pool_slots.release())
+    pool_stats["pooled"] += 1
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()
+        pool_stats["timeouts"] += 1
+        return [], ""
+    except BrokenProcessPool:
+        _drop_pool(pool)
+        return decode_cascade(image, target_size)
+
+
+def _pooled(image, target_size, timeout) -> list:
+    values, stage = _cascade(image, target_size, timeout)
+    stage_stats[stage] = stage_stats.get(stage, 0) + 1
+    return values
+
+
+def decode_qr_pooled(image, timeout: float = POOL_TIMEOUT, target_size: int = TARGET_SIZE) -> str:
+    """decode_qr_from_image on the shared pool; a job over `timeout` counts as no code found"""
+    values = _pooled(image, target_size, timeout)
+    return values[0] if values else ""
+
+
+def decode_all_qr_pooled(image, timeout: float = POOL_TIMEOUT, target_size: int = TARGET_SIZE) -> list:
+    """decode_all_qr_from_image on the shared pool; a job over `timeout` counts as no code found"""
+    return _pooled(image, target_size, timeout)
+
+
+def decode_stats() -> dict:
+    """Frames decoded per winning cascade stage ("none" = no code) plus pool counters"""
+    stats = {stage or "none": n for stage, n in stage_stats.items()}
+    stats.update(pool_stats)
+    return stats
+
+
+# --- Scan dedup (per gate) ---
+SCAN_DEDUP_TTL = float(os.environ.get("SCAN_DEDUP_TTL", 10.0))  # seconds a handled code stays suppressed
+SCAN_DEDUP_SIZE = int(os.environ.get("SCAN_DEDUP_SIZE", 256))
+
+
+def frame_fingerprint(data: bytes) -> str:
+    """Cheap hash of the encoded frame, to tell an unchanged camera frame from a new one"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ScanDedup:
+    """
+    Recently handled QR codes for one gate, plus the last frame seen.
+
+    A code is suppressed while it keeps showing up within `ttl` seconds of
+    its last sighting, so a ticket held in front of the camera is handled
+    once. At most `max_size` codes are remembered (oldest dropped first).
+    """
+
+    def __init__(self, ttl: float = SCAN_DEDUP_TTL, max_size: int = SCAN_DEDUP_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.last_frame = None
+        self._seen = OrderedDict()  # value -> last time it was seen
+        self._lock = threading.Lock()
+
+    def is_new_frame(self, data) -> bool:
+        """False when these frame bytes were already handled (e.g. st.camera_input on a rerun)"""
+        fingerprint = frame_fingerprint(data)
+        if fingerprint == self.last_frame:
+            return False
+        self.last_frame = fingerprint
+        return True
+
+    def fresh(self, values) -> list:
+        """The values not seen within the TTL; every value's sighting is recorded"""
+        now = time.monotonic()
+        out = []
+        with self._lock:
+            for value in values:
+                last = self._seen.pop(value, None)
+                if last is None or now - last > self.ttl:
+                    out.append(value)
+                self._seen[value] = now
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+        return out
+
+    def clear(self):
+        """Forget everything, e.g. after attendance rows were deleted"""
+        with self._lock:
+            self._seen.clear()
+        self.last_frame = None
+
+
+def session_dedup(state) -> ScanDedup:
+    """This gate's ScanDedup, kept in a session state mapping (st.session_state)"""
+    if "scan_dedup" not in state:
+        state["scan_dedup"] = ScanDedup()
+    return state["scan_dedup"]
+
+
+SCANNER_IDLE_TIMEOUT = float(os.environ.get("QR_SCANNER_IDLE_TIMEOUT", 10.0))  # seconds without a reader
+
+
+class FrameScanner:
+    """
+    Decodes a live stream of frames on a background thread and emits scan events.
+
+    Frames are handed over with submit(); only the newest one is kept, so when
+    the decoder falls behind it skips stale frames instead of building a
+    backlog. Each decoded code comes out of events() once, and the same code
+    is not reported again until it has been out of view for `repeat_after`
+    seconds, so a ticket held in front of the camera is one check-in.
+    With `idle_timeout`, the scanner stops by itself (and its feed() source is
+    closed) once events() hasn't been called for that long, so a session
+    that was closed without switching modes doesn't keep it running.
+    """
+
+    def __init__(self, repeat_after: float = 3.0, target_size: int = TARGET_SIZE, idle_timeout: float = None):
+        self.repeat_after = repeat_after
+        self.target_size = target_size
+        self.idle_timeout = idle_timeout
+        self.frames = 0
+        self._polled = time.monotonic()
+        self._frame = None
+        self._cond = threading.Condition()
+        self._events = queue.Queue()
+        self._recent = ScanDedup(ttl=repeat_after)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="qr-scanner", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame):
+        """Offer a frame (array or PIL image); replaces any frame not yet decoded"""
+        with self._cond:
+            self._frame = frame
+            self._cond.notify()
+
+    def events(self) -> list:
+        """Codes decoded since the last call, oldest first"""
+        self._polled = time.monotonic()
+        out = []
+        while True:
+            try:
+                out.append(self._events.get_nowait())
+            except queue.Empty:
+                return out
+
+    def feed(self, source, fps: float = 15):
+        """
+        Push frames from an iterable (e.g. camera_frames()) on a background thread;
+        the source is closed when the scanner stops (releasing a camera)
+        """
+        def pump():
+            try:
+                for frame in source:
+                    if not self.running:
+                        break
+                    self.submit(frame)
+                    time.sleep(1 / fps)
+            finally:
+                close = getattr(source, "close", None)
+                if close is not None:
+                    close()
+        thread = threading.Thread(target=pump, name="qr-scanner-source", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify()
+
+    @property
+    def running(self) -> bool:
+        return self._running and self._thread.is_alive()
+
+    def _idle(self) -> bool:
+        return self.idle_timeout is not None and time.monotonic() - self._polled > self.idle_timeout
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._frame is None and self._running and not self._idle():
+                    self._cond.wait(1)
+                if self._idle():
+                    self._running = False  # nobody reads the results any more
+                if not self._running:
+                    return
+                frame, self._frame = self._frame, None
+            values = decode_all_qr_pooled(frame, target_size=self.target_size)
+            self.frames += 1
+            for value in self._recent.fresh(values):
+                self._events.put(value)
+
+
+_camera_scanners = {}  # server camera source -> FrameScanner
+_camera_lock = threading.Lock()
+
+
+def camera_scanner(source=0, idle_timeout: float = SCANNER_IDLE_TIMEOUT) -> FrameScanner:
+    """
+    The scanner reading a server-side camera, shared by every session in this
+    process, as the device can only be opened once. It stops and releases the
+    camera when no session has read it for `idle_timeout` seconds; the next call
+    then opens it again.
+    """
+    with _camera_lock:
+        scanner = _camera_scanners.get(source)
+        if scanner is None or not scanner.running:
+            scanner = _camera_scanners[source] = FrameScanner(idle_timeout=idle_timeout)
+            scanner.feed(camera_frames(source))
+        return scanner
+
+
+def camera_frames(source=0):
+    """Frames from a local camera index or video file (server-side capture, also handy for testing)"""
+    cap = cv2.VideoCapture(source)
+    try:
+        while cap.isOpened():
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    finally:
+        cap.release()
@@ -0,0 +1,221 @@
+import random
+import socket
+import threading
+import time
+from collections import deque
+
+import google_auth_httplib2
+import httplib2
+from googleapiclient.errors import HttpError
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# writes are not idempotent (an append or a deleteDimension applied twice
+# duplicates or removes the wrong rows), so they are only retried when the
+# server says it rejected the request without applying it
+WRITE_RETRY_STATUSES = {429}
+
+
+class TokenBucket:
+    """`rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, sleeping until one is free; returns the seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)  # the token is already reserved, callers queue up in order
+        return wait
+
+
+class SheetsClient:
+    """
+    Rate-limited, retrying executor for Google Sheets/Drive API requests.
+
+    Build requests as usual and run them with execute(endpoint, request) instead
+    of request.execute():
+    - every call takes a token from its kind's bucket ("read" or "write"), sized
+      to the per-user Sheets quota (the service account is one user);
+    - reads are retried on 429/5xx and dropped connections, writes only on 429,
+      with jittered exponential backoff (honouring Retry-After); a write that
+      fails otherwise may or may not have been applied, so it is raised and the
+      caller re-reads the sheet or relies on its journal;
+    - identical reads running at the same time (same `key`) share one request;
+    - authorised HTTP connections are kept in a small pool and lent to one call
+      at a time, as httplib2 is not thread-safe and Streamlit runs every rerun
+      on a new thread (a per-thread connection would lose keep-alive).
+    Per-endpoint counters and the calls made in the last minute are in stats().
+    """
+
+    def __init__(self, creds, reads_per_min: float = 60, writes_per_min: float = 60,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 8.0, pool_size: int = 4):
+        self._creds = creds
+        self._pool_size = pool_size
+        self._idle = []  # idle AuthorizedHttp connections
+        self.buckets = {
+            "read": TokenBucket(reads_per_min / 60, max(reads_per_min / 6, 1)),
+            "write": TokenBucket(writes_per_min / 60, max(writes_per_min / 6, 1)),
+        }
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._inflight = {}  # key -> (done event, result holder)
+        self._lock = threading.Lock()
+        self._counters = {}  # endpoint -> {"calls", "retries", "errors", "coalesced", "waited"}
+        self._recent = {kind: deque() for kind in self.buckets}  # call times, last 60 s
+
+    def _borrow(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return google_auth_httplib2.AuthorizedHttp(self._creds, http=httplib2.Http(timeout=30))
+
+    def _give_back(self, http):
+        with self._lock:
+            if len(self._idle) < self._pool_size:
+                self._idle.append(http)
+
+    def _count(self, endpoint: str, field: str, amount=1):
+        with self._lock:
+            counters = self._counters.setdefault(
+                endpoint, {"calls": 0, "retries": 0, "errors": 0, "coalesced": 0, "waited": 0.0}
+            )
+            counters[field] += amount
+
+    def execute(self, endpoint: str, request, kind: str = "read", key=None):
+        """Run an API request; `kind` picks the quota bucket (None = not limited)"""
+        if key is None:
+            return self._execute(endpoint, request, kind)
+        with self._lock:
+            shared = self._inflight.get(key)
+            owner = shared is None
+            if owner:
+                shared = self._inflight[key] = (threading.Event(), {})
+        done, holder = shared
+        if not owner:
+            self._count(endpoint, "coalesced")
+            done.wait()
+            if "error" in holder:
+                raise holder["error"]
+            return holder["result"]
+        try:
+            holder["result"] = self._execute(endpoint, request, kind)
+            return holder["result"]
+        except Exception as e:
+            holder["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    def _execute(self, endpoint: str, request, kind: str):
+        statuses = WRITE_RETRY_STATUSES if kind == "write" else RETRY_STATUSES
+        for attempt in range(self.max_retries + 1):
+            if kind in self.buckets:
+                self._count(endpoint, "waited", self.buckets[kind].acquire())
+                self._note_call(kind)
+            self._count(endpoint, "calls")
+            http = self._borrow()
+            try:
+                result = request.execute(http=http)
+            except HttpError as e:
+                self._give_back(http)
+                if e.resp.status not in statuses or attempt == self.max_retries:
+                    self._count(endpoint, "errors")
+                    raise
+                retry_after = e.resp.get("retry-after")
+            except (socket.timeout, ConnectionError, httplib2.HttpLib2Error):
+                # the connection may be broken, so it is dropped rather than pooled;
+                # a write may have been applied before the connection went
+                if kind == "write" or attempt == self.max_retries:
+                    self._count(endpoint, "errors")
+                    raise
+                retry_after = None
+            else:
+                self._give_back(http)
+                return result
+            self._count(endpoint, "retries")
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+            if retry_after and str(retry_after).isdigit():
+                delay = max(delay, min(float(retry_after), self.max_delay))
+            time.sleep(delay)
+
+    def _note_call(self, kind: str):
+        now = time.monotonic()
+        with self._lock:
+            recent = self._recent[kind]
+            recent.append(now)
+            while recent and now - recent[0] > 60:
+                recent.popleft()
+
+    def stats(self) -> dict:
+        """{"endpoints": per-endpoint counters, "last_minute": calls per kind in the last 60 s}"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "endpoints": {k: dict(v) for k, v in self._counters.items()},
+                "last_minute": {k: sum(1 for t in q if now - t <= 60) for k, q in self._recent.items()},
+            }
+
+
+def is_transient(error) -> bool:
+    """True for failures worth retrying later (dropped connections, 429, 5xx), not for 4xx rejections"""
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRY_STATUSES or error.resp.status >= 500
+    return isinstance(error, (OSError, httplib2.HttpLib2Error))
+
+
+def sheet_gid(client: SheetsClient, service, sheet_id: str, title: str = "Sheet1") -> int:
+    """Numeric ID of a tab (deleteDimension needs it, not the tab name)"""
+    meta = client.execute("spreadsheets.get", service.spreadsheets().get(
+        spreadsheetId=sheet_id, fields="sheets.properties(sheetId,title)"
+    ))
+    for sheet in meta.get("sheets", []):
+        if sheet["properties"]["title"] == title:
+            return sheet["properties"]["sheetId"]
+    raise ValueError(f"No tab named {title!r} in the sheet")
+
+
+def delete_rows_matching(client: SheetsClient, service, sheet_id: str, value, gid, tab: str = "Sheet1",
+                         columns=("ID", "Matric")) -> int:
+    """
+    Delete every row whose ID or Matric equals value (case-insensitive) with one
+    batchUpdate, whatever the sheet size. Row positions come from a fresh read, so
+    rows appended by other gates since the last refresh are not hit by mistake.
+    `gid` returns the tab's numeric ID (only called when there is something to delete).
+    Returns the number of rows deleted.
+    """
+    value = str(value).strip().lower()
+    values = client.execute("values.get", service.spreadsheets().values().get(
+        spreadsheetId=sheet_id, range=f"{tab}!A:C"
+    )).get("values", [])
+    if not values:
+        return 0
+    cols = [values[0].index(c) for c in columns if c in values[0]]
+    rows = [
+        i for i, row in enumerate(values[1:], start=1)
+        if any(c < len(row) and str(row[c]).strip().lower() == value for c in cols)
+    ]
+    if not rows:
+        return 0
+    tab_id = gid()
+    # bottom-up, so each delete leaves the earlier row positions unchanged
+    requests = [
+        {"deleteDimension": {"range": {"sheetId": tab_id, "dimension": "ROWS", "startIndex": i, "endIndex": i + 1}}}
+        for i in sorted(rows, reverse=True)
+    ]
+    client.execute("batchUpdate", service.spreadsheets().batchUpdate(
+        spreadsheetId=sheet_id, body={"requests": requests}
+    ), kind="write")
+    return len(rows)
@@ -0,0 +1,345 @@
+"""
+Attendance storage backends for bench_storage.py.
+
+AttendanceStorage is the common shape of the gates' stores: load the main
+list, look a ticket up, check tickets in, delete, clear and export. The three
+classes below implement it, and open_storage() picks one from a config dict,
+so the same workload can be run against each.
+
+This is a benchmark abstraction only, no gate page runs on it. The pages keep
+their own check-in, delete and clear paths (journal, write-behind queue, scan
+dedup), and only share the request code underneath: sheets_client.py (rate
+limits, retries, row deletes) and supabase_client.py (timeouts, retries, the
+upsert with its no-unique-ID fallback). Deletes here match the ID or Matric
+as given, and SupabaseStorage.clear() filters on "ID is not null" so it also
+works where unfiltered deletes are refused.
+
+    storage = open_storage({"backend": "csv", "main": "ENTRY.xlsx", "attendance": "att.csv"})
+    storage = open_storage({"backend": "sheets", "main": SHEET_ID, "attendance": SHEET_ID,
+                            "service_account": "service_account.json"})
+    storage = open_storage({"backend": "supabase", "url": URL, "key": KEY,
+                            "main": "Main_RockIndie", "attendance": "Att_RockIndie"})
+
+Only the CSV backend works without the Google/Supabase client libraries.
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from ticket_import import COLUMNS, normalize_ticket
+
+
+class AttendanceStorage(ABC):
+    """
+    One event's main ticket list and attendance list.
+
+    Subclasses implement the _read_main/_read_attendance/_append hooks plus
+    delete() and clear(); lookups and duplicate checks are shared. The main
+    list and the set of checked-in IDs are loaded once and then kept in
+    memory, the way the gate pages cache them.
+    """
+
+    backend = ""
+
+    def __init__(self):
+        self._main = None
+        self._index = None    # normalized ID/Matric -> row position in the main list
+        self._present = None  # normalized IDs already checked in
+
+    # --- backend hooks ---
+
+    @abstractmethod
+    def _read_main(self) -> pd.DataFrame:
+        """The main ticket list"""
+
+    @abstractmethod
+    def _read_attendance(self) -> pd.DataFrame:
+        """The attendance list"""
+
+    @abstractmethod
+    def _append(self, rows: list) -> set:
+        """Write new attendance rows, returns the IDs actually written"""
+
+    @abstractmethod
+    def delete(self, value) -> int:
+        """Remove check-ins by ID or Matric, returns the number of rows removed"""
+
+    @abstractmethod
+    def clear(self):
+        """Remove every check-in"""
+
+    # --- shared logic ---
+
+    def load_main_list(self, refresh: bool = False) -> pd.DataFrame:
+        if self._main is None or refresh:
+            main = self._read_main()
+            main = main[[c for c in COLUMNS if c in main.columns]].reset_index(drop=True)
+            # first matching row wins, as in the pages' build_ticket_index
+            index = {}
+            columns = [main[c].tolist() for c in ("ID", "Matric") if c in main.columns]
+            for pos, values in enumerate(zip(*columns)):
+                for value in values:
+                    key = normalize_ticket(value)
+                    if key:
+                        index.setdefault(key, pos)
+            self._main, self._index = main, index
+        return self._main
+
+    def lookup(self, value):
+        """Main-list row (dict) for a ticket ID or Matric, or None"""
+        self.load_main_list()
+        pos = self._index.get(normalize_ticket(value))
+        return None if pos is None else self._main.iloc[pos].to_dict()
+
+    def present_ids(self, refresh: bool = False) -> set:
+        if self._present is None or refresh:
+            att = self._read_attendance()
+            self._present = {normalize_ticket(v) for v in att["ID"].tolist()} if "ID" in att.columns else set()
+        return self._present
+
+    def check_in(self, values: list) -> list:
+        """
+        Check in every scanned value with one write. Returns a status per value:
+        "created", "present" (already checked in) or "unknown" (not in the main list).
+        """
+        present = self.present_ids()
+        statuses = ["unknown"] * len(values)
+        new_rows = {}  # position -> row
+        for i, value in enumerate(values):
+            row = self.lookup(value)
+            if row is None:
+                continue
+            key = normalize_ticket(row["ID"])
+            if key in present or any(normalize_ticket(r["ID"]) == key for r in new_rows.values()):
+                statuses[i] = "present"
+            else:
+                new_rows[i] = {c: row.get(c) for c in COLUMNS}
+        if new_rows:
+            written = {normalize_ticket(v) for v in self._append(list(new_rows.values()))}
+            for i, row in new_rows.items():
+                key = normalize_ticket(row["ID"])
+                statuses[i] = "created" if key in written else "present"
+                present.add(key)
+        return statuses
+
+    def export(self) -> pd.DataFrame:
+        """Attendance list as a DataFrame"""
+        return self._read_attendance()
+
+    def _forget(self, value=None):
+        """Drop cached check-ins after a delete (by ID or Matric) or a clear (None)"""
+        if value is None:
+            self._present = set()
+        elif self._present is not None:
+            row = self.lookup(value)
+            self._present.discard(normalize_ticket(value))
+            if row is not None:
+                self._present.discard(normalize_ticket(row["ID"]))
+
+
+class CsvStorage(AttendanceStorage):
+    """
+    Main list from an xlsx/csv file (or a DataFrame already loaded, None for
+    none), attendance appended to a local CSV, like homepage.py's.
+    """
+
+    backend = "csv"
+
+    def __init__(self, main, attendance: str):
+        super().__init__()
+        self.main_path = main
+        self.attendance_path = attendance
+
+    def _read_main(self):
+        if self.main_path is None:
+            return pd.DataFrame(columns=COLUMNS)
+        if isinstance(self.main_path, pd.DataFrame):
+            return self.main_path
+        if str(self.main_path).lower().endswith(".csv"):
+            return pd.read_csv(self.main_path, dtype=str)
+        return pd.read_excel(self.main_path, dtype=str)
+
+    def _read_attendance(self):
+        if not os.path.exists(self.attendance_path):
+            return pd.DataFrame(columns=COLUMNS)
+        try:
+            return pd.read_csv(self.attendance_path, dtype=str)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame(columns=COLUMNS)
+
+    def _append(self, rows):
+        exists = os.path.exists(self.attendance_path) and os.path.getsize(self.attendance_path) > 0
+        # keep the column order of an existing file (older files may carry extra main-list columns)
+        columns = list(pd.read_csv(self.attendance_path, nrows=0).columns) if exists else COLUMNS
+        frame = pd.DataFrame(rows, columns=COLUMNS).reindex(columns=columns)
+        frame.to_csv(self.attendance_path, mode="a", header=not exists, index=False)
+        return {r["ID"] for r in rows}
+
+    def delete(self, value):
+        att = self._read_attendance()
+        key = normalize_ticket(value)
+        keep = pd.Series(True, index=att.index)
+        for col in ("ID", "Matric"):
+            if col in att.columns:
+                keep &= ~att[col].map(normalize_ticket).eq(key)
+        att[keep].to_csv(self.attendance_path, index=False)
+        self._forget(value)
+        return int((~keep).sum())
+
+    def clear(self):
+        pd.DataFrame(columns=COLUMNS).to_csv(self.attendance_path, index=False)
+        self._forget()
+
+
+class SheetsStorage(AttendanceStorage):
+    """Main list and attendance in Google Sheets (testdb.py/testlogin.py), via SheetsClient"""
+
+    backend = "sheets"
+
+    def __init__(self, main: str, attendance: str, service_account, reads_per_min: float = 60,
+                 writes_per_min: float = 60, tab: str = "Sheet1"):
+        super().__init__()
+        from google.oauth2.service_account import Credentials
+        from googleapiclient.discovery import build
+
+        from sheets_client import SheetsClient
+
+        if isinstance(service_account, str):
+            with open(service_account) as f:
+                service_account = json.load(f)
+        creds = Credentials.from_service_account_info(
+            service_account, scopes=["https://www.googleapis.com/auth/spreadsheets"]
+        )
+        self.service = build("sheets", "v4", credentials=creds)
+        self.client = SheetsClient(creds, reads_per_min, writes_per_min)
+        self.main_id = main
+        self.attendance_id = attendance
+        self.tab = tab
+        self._gid = None
+
+    def _values(self, sheet_id):
+        return self.client.execute("values.get", self.service.spreadsheets().values().get(
+            spreadsheetId=sheet_id, range=f"{self.tab}!A:C"
+        )).get("values", [])
+
+    def _frame(self, sheet_id):
+        values = self._values(sheet_id)
+        if not values:
+            return pd.DataFrame(columns=COLUMNS)
+        width = len(values[0])
+        return pd.DataFrame([r + [""] * (width - len(r)) for r in values[1:]], columns=values[0])
+
+    def _read_main(self):
+        return self._frame(self.main_id)
+
+    def _read_attendance(self):
+        return self._frame(self.attendance_id)
+
+    def _append(self, rows):
+        self.client.execute("values.append", self.service.spreadsheets().values().append(
+            spreadsheetId=self.attendance_id,
+            range=f"{self.tab}!A1",
+            valueInputOption="USER_ENTERED",
+            insertDataOption="INSERT_ROWS",
+            body={"values": [[r[c] for c in COLUMNS] for r in rows]},
+        ), kind="write")
+        return {r["ID"] for r in rows}
+
+    def delete(self, value):
+        from sheets_client import delete_rows_matching
+
+        deleted = delete_rows_matching(
+            self.client, self.service, self.attendance_id, value, self._tab_gid, tab=self.tab
+        )
+        self._forget(value)
+        return deleted
+
+    def _tab_gid(self):
+        from sheets_client import sheet_gid
+
+        if self._gid is None:
+            self._gid = sheet_gid(self.client, self.service, self.attendance_id, self.tab)
+        return self._gid
+
+    def clear(self):
+        self.client.execute("values.clear", self.service.spreadsheets().values().clear(
+            spreadsheetId=self.attendance_id, range=f"{self.tab}!A2:Z"
+        ), kind="write")
+        self._forget()
+
+
+class SupabaseStorage(AttendanceStorage):
+    """Main_* and Att_* tables in Supabase (testdb2.py/testbutton.py), via supabase_client"""
+
+    backend = "supabase"
+
+    def __init__(self, url: str, key: str, main: str, attendance: str, page_size: int = 1000):
+        super().__init__()
+        from supabase_client import create_tuned_client
+
+        self.client = create_tuned_client(url, key)
+        self.main_table = main
+        self.attendance_table = attendance
+        self.page_size = page_size
+        self._no_unique_id = set()
+
+    def _run(self, query, retry: bool = False):
+        from supabase_client import execute
+
+        return execute(query, retry)
+
+    def _read_table(self, table):
+        rows, start = [], 0
+        while True:
+            # "id" breaks ties, ID alone may repeat and offset paging needs a unique order
+            page = self._run(
+                self.client.table(table).select(",".join(COLUMNS))
+                .order("ID").order("id").range(start, start + self.page_size - 1),
+                retry=True,
+            ).data
+            rows.extend(page)
+            if not page:
+                return pd.DataFrame(rows, columns=COLUMNS)
+            start += len(page)  # the server may cap pages below page_size
+
+    def _read_main(self):
+        return self._read_table(self.main_table)
+
+    def _read_attendance(self):
+        return self._read_table(self.attendance_table)
+
+    def _append(self, rows):
+        from supabase_client import insert_new_rows
+
+        return insert_new_rows(self.client, self.attendance_table, rows, self._no_unique_id, run=self._run)
+
+    def delete(self, value):
+        value = str(value).strip()
+        res = self._run(self.client.table(self.attendance_table).delete().or_(
+            f"ID.eq.{value},Matric.eq.{value}"
+        ))
+        self._forget(value)
+        return len(res.data)
+
+    def clear(self):
+        self._run(self.client.table(self.attendance_table).delete().not_.is_("ID", "null"))
+        self._forget()
+
+
+BACKENDS = {
+    "csv": CsvStorage,
+    "sheets": SheetsStorage,
+    "supabase": SupabaseStorage,
+}
+
+
+def open_storage(config: dict) -> AttendanceStorage:
+    """Storage for {"backend": "csv" | "sheets" | "supabase", ...constructor arguments}"""
+    config = dict(config)
+    backend = config.pop("backend", "csv")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[backend](**config)
+
@@ -0,0 +1,106 @@
+import os
+import random
+import time
+
+import httpx
+from supabase import Client, create_client
+from supabase.lib.client_options import ClientOptions
+
+# Transport settings, override with environment variables on the gate server
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", "8"))        # seconds per request
+SUPABASE_CONNECT_TIMEOUT = float(os.environ.get("SUPABASE_CONNECT_TIMEOUT", "3"))
+SUPABASE_POOL_SIZE = int(os.environ.get("SUPABASE_POOL_SIZE", "20"))     # keep-alive connections
+SUPABASE_RETRIES = int(os.environ.get("SUPABASE_RETRIES", "3"))          # attempts for reads
+SUPABASE_BACKOFF = float(os.environ.get("SUPABASE_BACKOFF", "0.25"))     # base backoff, seconds
+
+
+def create_tuned_client(url: str, key: str) -> Client:
+    """Supabase client with explicit timeouts and a keep-alive connection pool"""
+    client = create_client(url, key, options=ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT))
+    # swap PostgREST's default httpx session for one with explicit pool limits/timeouts
+    # (the client only rebuilds it on auth events, and the gates never sign in)
+    pg = client.postgrest
+    old_session = pg.session
+    pg.session = httpx.Client(
+        base_url=old_session.base_url,
+        headers=old_session.headers,
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_POOL_SIZE,
+            keepalive_expiry=30,
+        ),
+    )
+    old_session.close()
+    return client
+
+
+def execute(query, retry: bool = False, record=None):
+    """
+    Execute a Supabase query; record(seconds, failed) is called per attempt.
+    Idempotent reads pass retry=True to retry network errors with jittered exponential backoff.
+    """
+    attempts = SUPABASE_RETRIES if retry else 1
+    for attempt in range(attempts):
+        start = time.perf_counter()
+        try:
+            res = query.execute()
+            if record is not None:
+                record(time.perf_counter() - start, False)
+            return res
+        except httpx.TransportError:
+            if record is not None:
+                record(time.perf_counter() - start, True)
+            if attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0, SUPABASE_BACKOFF * 2 ** attempt))
+        except Exception:
+            if record is not None:
+                record(time.perf_counter() - start, True)
+            raise
+
+
+# SQLSTATE classes / PostgREST codes that mean "try again later" rather than a refused request:
+# connection exceptions, transaction rollback (serialization, deadlock), insufficient
+# resources, operator intervention (shutdown, cancelled) and PostgREST's own
+# "database unreachable" errors
+TRANSIENT_CODES = ("08", "40", "53", "57", "PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+
+def is_transient(error) -> bool:
+    """True for failures worth retrying (network, database busy or restarting), not for refused rows"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if not hasattr(error, "code"):
+        return False  # not an API error (a bug, bad data): retrying won't help
+    if not error.code:
+        return True  # no SQLSTATE, e.g. a gateway error page: the database wasn't reached
+    return str(error.code).startswith(TRANSIENT_CODES)
+
+
+def insert_new_rows(client: Client, table: str, rows: list, no_unique_id: set, run=execute) -> set:
+    """
+    Insert rows in one round trip, skipping IDs already in the table.
+    Returns the IDs that were actually inserted.
+    Needs a unique constraint on the ID column, e.g.
+        alter table "Att_RockIndie" add constraint "Att_RockIndie_ID_key" unique ("ID");
+    Without it, falls back to a select for existing IDs followed by an insert.
+    Tables found without one are added to `no_unique_id` and go straight to the
+    fallback next time. run(query, retry=...) executes each request.
+    """
+    if table not in no_unique_id:
+        try:
+            res = run(client.table(table).upsert(rows, on_conflict="ID", ignore_duplicates=True))
+            return {str(r["ID"]) for r in res.data}
+        except Exception as e:
+            # 42P10 = no unique constraint matching ON CONFLICT
+            if getattr(e, "code", None) != "42P10":
+                raise
+            no_unique_id.add(table)
+    ids = [r["ID"] for r in rows]
+    check = run(client.table(table).select("ID").in_("ID", ids), retry=True)
+    existing = {str(r["ID"]) for r in check.data}
+    rows = [r for r in rows if str(r["ID"]) not in existing]
+    if rows:
+        run(client.table(table).insert(rows))
+    return {str(r["ID"]) for r in rows}
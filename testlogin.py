@@ -3,19 +3,55 @@ import pandas as pd
 from io import BytesIO
 import os
 import time
-import cv2
-import numpy as np
-from PIL import Image
+from qrscan import SCANNER_IDLE_TIMEOUT, decode_all_qr_pooled, FrameScanner, session_dedup, camera_scanner
+from tickets import TicketError, read_ticket
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from checkin_journal import backlog_status, open_journal
+from checkin_queue import WriteBehindQueue
+import sheets_client
+from sheets_client import SheetsClient
+try:
+    from streamlit_webrtc import webrtc_streamer
+except ImportError:  # live stream mode needs streamlit-webrtc
+    webrtc_streamer = None
+
+# Server-side camera index or video file for the "Server camera" scan mode (e.g. a
+# webcam on the gate laptop running the app, or a recorded clip for testing)
+SERVER_CAMERA = os.environ.get("SERVER_CAMERA", "")
+if SERVER_CAMERA.isdigit():
+    SERVER_CAMERA = int(SERVER_CAMERA)
+
+SCAN_MODES = ["📸 Snapshot"]
+if webrtc_streamer is not None:
+    SCAN_MODES.append("🎥 Live stream")
+if SERVER_CAMERA != "":
+    SCAN_MODES.append("🖥 Server camera")
 
 
 # ================= GOOGLE SHEET SETUP ==================
 service_account_info = st.secrets["gcp_service_account"]
 
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive.metadata.readonly",  # revision checks for the read cache
+]
 creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
 sheets_service = build("sheets", "v4", credentials=creds)
+drive_service = build("drive", "v3", credentials=creds)
+
+# Every request goes through one rate-limited, retrying client (see SheetsClient);
+# the defaults match the per-user Sheets quota of 60 reads and 60 writes a minute
+SHEETS_READS_PER_MIN = float(os.environ.get("SHEETS_READS_PER_MIN", "60"))
+SHEETS_WRITES_PER_MIN = float(os.environ.get("SHEETS_WRITES_PER_MIN", "60"))
+
+@st.cache_resource
+def get_sheets_client():
+    """Shared by every session on this server, so the quota is tracked server-wide"""
+    return SheetsClient(creds, SHEETS_READS_PER_MIN, SHEETS_WRITES_PER_MIN)
+
+sheets = get_sheets_client()
 
 # --- Helper Functions ---
 # Helper: write a DataFrame to a sheet (header + rows)
@@ -28,12 +64,12 @@ def write_df_to_sheet(sheet_id, df, sheet_range="Sheet1!A1"):
     header = list(df.columns)
     rows = df.astype(str).values.tolist() if not df.empty else []
     values = [header] + rows
-    sheets_service.spreadsheets().values().update(
+    sheets.execute("values.update", sheets_service.spreadsheets().values().update(
         spreadsheetId=sheet_id,
         range=sheet_range,
         valueInputOption="RAW",
         body={"values": values}
-    ).execute()
+    ), kind="write")
 
 
 # Helper: refresh local attendance cache from the sheet
@@ -51,11 +87,62 @@ def refresh_attendance_from_sheet(sheet_id, required_columns=["Name","Matric","I
     except Exception:
         st.session_state.attendance = pd.DataFrame(columns=required_columns)
 
+# --- Shared read cache ---
+# A sheet is only downloaded again when its Drive revision changed; the
+# revision itself is checked at most every READ_CACHE_CHECK seconds. Without
+# Drive access (API not enabled for the project, scope missing) values are
+# kept READ_CACHE_TTL seconds instead, and Drive is retried after DRIVE_RETRY.
+READ_CACHE_CHECK = float(os.environ.get("READ_CACHE_CHECK", "2"))
+READ_CACHE_TTL = float(os.environ.get("READ_CACHE_TTL", "10"))
+DRIVE_RETRY = 300  # seconds
+
+@st.cache_resource
+def sheet_read_cache():
+    """(spreadsheet ID, range) -> {"version", "checked", "df"}, shared by every session"""
+    return {}
+
+@st.cache_resource
+def drive_status():
+    """When the last revision check failed, shared by every session"""
+    return {"failed": 0.0}
+
+def sheet_version(sheet_id):
+    """Drive revision number of the spreadsheet, goes up on every edit (None without Drive access)"""
+    status = drive_status()
+    if time.time() - status["failed"] < DRIVE_RETRY:
+        return None
+    request = drive_service.files().get(fileId=sheet_id, fields="version", supportsAllDrives=True)
+    try:
+        # Drive has its own (much larger) quota, so it isn't metered against the Sheets buckets
+        return sheets.execute("drive.files.get", request, kind=None, key=("version", sheet_id))["version"]
+    except Exception:
+        status["failed"] = time.time()
+        return None
+
 def read_sheet(sheet_id, range_name="Sheet1!A:C"):
+    """Read data from Google Sheet and return DataFrame (cached until the sheet changes)"""
+    cache = sheet_read_cache()
+    entry = cache.get((sheet_id, range_name))
+    now = time.time()
+    if entry is not None:
+        max_age = READ_CACHE_CHECK if entry["version"] is not None else READ_CACHE_TTL
+        if now - entry["checked"] < max_age:
+            return entry["df"].copy()
+    version = sheet_version(sheet_id)
+    if entry is not None and version is not None and entry["version"] == version:
+        entry["checked"] = now
+        return entry["df"].copy()
+    # the revision is read before the values, so a concurrent edit only causes one extra download
+    df = download_sheet(sheet_id, range_name)
+    cache[(sheet_id, range_name)] = {"version": version, "checked": now, "df": df}
+    return df.copy()
+
+def download_sheet(sheet_id, range_name="Sheet1!A:C"):
     """Read data from Google Sheet and return DataFrame"""
-    result = sheets_service.spreadsheets().values().get(
+    # sessions reloading the same sheet at the same moment share one request
+    result = sheets.execute("values.get", sheets_service.spreadsheets().values().get(
         spreadsheetId=sheet_id, range=range_name
-    ).execute()
+    ), key=("values.get", sheet_id, range_name))
     values = result.get("values", [])
     if not values:
         return pd.DataFrame(columns=["Name", "Matric", "ID"])
@@ -66,19 +153,168 @@ def read_sheet(sheet_id, range_name="Sheet1!A:C"):
 
 def append_to_sheet(sheet_id, row_data):
     """Append a row to the attendance sheet"""
-    sheets_service.spreadsheets().values().append(
+    sheets.execute("values.append", sheets_service.spreadsheets().values().append(
         spreadsheetId=sheet_id,
         range="Sheet1!A1",
         valueInputOption="USER_ENTERED",
         insertDataOption="INSERT_ROWS",
         body={"values": [row_data]},
-    ).execute()
+    ), kind="write")
+
+def append_rows_to_sheet(sheet_id, rows):
+    """Append several rows to the attendance sheet in one request"""
+    sheets.execute("values.append", sheets_service.spreadsheets().values().append(
+        spreadsheetId=sheet_id,
+        range="Sheet1!A1",
+        valueInputOption="USER_ENTERED",
+        insertDataOption="INSERT_ROWS",
+        body={"values": rows},
+    ), kind="write")
+
+# --- Offline check-in journal ---
+CHECKIN_JOURNAL = os.environ.get("CHECKIN_JOURNAL", "checkins.db")
+OFFLINE_RETRY = 30  # seconds before retrying Google Sheets after a failed replay
+
+journal = open_journal(CHECKIN_JOURNAL)  # shared by every session and page (see open_journal)
+
+def replay_journal(sheet_id):
+    """Append check-ins journalled while Google Sheets was unreachable, in batches"""
+    if not journal.pending_count(sheet_id):
+        return 0
+    # rows still in the append buffer are written by it, not replayed twice
+    skip = get_checkin_queue(sheet_id).keys() if CHECKIN_MODE == "write_behind" else set()
+    return journal.replay(
+        sheet_id,
+        lambda rows: append_checkin_rows(sheet_id, [{"ID": r["ID"], "values": [r["Name"], r["Matric"], r["ID"]]} for r in rows]),
+        skip=skip,
+        retry=OFFLINE_RETRY,
+    )
+
+@st.cache_resource
+def unsure_appends():
+    """Sheets whose last check-in append failed without saying whether it was applied"""
+    return set()
+
+def append_checkin_rows(sheet_id, rows):
+    """
+    Append check-ins ({"ID": ..., "values": [cells]}) in one request. Appends are
+    never retried blindly: after one fails with a timeout or 5xx it may still have
+    landed, so the next attempt re-reads the sheet and skips rows already in it.
+    """
+    unsure = unsure_appends()
+    if sheet_id in unsure:
+        df = download_sheet(sheet_id)
+        present = set(df["ID"].astype(str).str.strip()) if "ID" in df.columns else set()
+        rows = [r for r in rows if str(r["ID"]).strip() not in present]
+        unsure.discard(sheet_id)
+    if not rows:
+        return
+    try:
+        append_rows_to_sheet(sheet_id, [r["values"] for r in rows])
+    except Exception as e:
+        # a 4xx is a clean rejection, anything else may have been applied
+        if not (isinstance(e, HttpError) and 400 <= e.resp.status < 500):
+            unsure.add(sheet_id)
+        raise
+
+# --- Buffered appends ---
+# "write_behind" acknowledges a check-in at once and appends everything queued
+# every CHECKIN_FLUSH_MS as one multi-row request; "direct" appends inside the
+# operator's callback. Rows are journalled first either way, so a crash before
+# the flush loses nothing: pending rows are replayed on the next run. Buffering
+# is the default here (unlike the Supabase pages' CHECKIN_MODE), as one append
+# per scan soon runs into the 60 writes a minute Sheets quota.
+CHECKIN_MODE = os.environ.get("SHEETS_CHECKIN_MODE", "write_behind")
+CHECKIN_FLUSH_MS = int(os.environ.get("CHECKIN_FLUSH_MS", "500"))
+CHECKIN_FLUSH_ROWS = int(os.environ.get("CHECKIN_FLUSH_ROWS", "200"))
+
+def flush_checkins(sheet_id, rows):
+    """Append a batch from the buffer in one request and mark it synced in the journal"""
+    append_checkin_rows(sheet_id, rows)
+    journal.mark_synced(sheet_id, [r["ID"] for r in rows])
+
+@st.cache_resource
+def get_checkin_queue(sheet_id) -> WriteBehindQueue:
+    """Append buffer for one attendance sheet, shared by every session (flushed at exit too)"""
+    return WriteBehindQueue(
+        lambda rows: flush_checkins(sheet_id, rows),
+        interval_ms=CHECKIN_FLUSH_MS,
+        max_rows=CHECKIN_FLUSH_ROWS,
+        retryable=sheets_client.is_transient,
+        # a refused row would fail every replay too, so it leaves the journal
+        on_reject=lambda row, error: journal.delete(sheet_id, row["ID"]),
+    )
+
+def write_checkins(sheet_id, rows):
+    """
+    Send journalled check-ins ({"ID": ..., "values": [cells]}) to the sheet.
+    Returns False if they could only be kept offline (network errors, 429, 5xx);
+    a request Google rejects outright (bad range, sheet no longer shared) is
+    dropped from the journal and raised, as replaying it would never succeed.
+    """
+    if CHECKIN_MODE == "write_behind":
+        queue = get_checkin_queue(sheet_id)
+        for r in rows:
+            queue.put(r)
+        return True
+    try:
+        append_checkin_rows(sheet_id, rows)
+    except Exception as e:
+        if sheets_client.is_transient(e):
+            return False
+        for r in rows:
+            journal.delete(sheet_id, r["ID"])
+        raise
+    journal.mark_synced(sheet_id, [r["ID"] for r in rows])
+    return True
+
+def flush_checkin_buffer(sheet_id):
+    """Write out anything still buffered"""
+    if CHECKIN_MODE == "write_behind":
+        get_checkin_queue(sheet_id).flush()
+
+def drop_buffered_checkins(sheet_id, ids=None):
+    """
+    Forget buffered check-ins for these ticket IDs (all if None) before they are
+    deleted from the sheet, so a later flush can't bring them back
+    """
+    if CHECKIN_MODE == "write_behind":
+        ids = None if ids is None else {str(i).strip().lower() for i in ids}
+        get_checkin_queue(sheet_id).discard(None if ids is None else lambda r: str(r["ID"]).strip().lower() in ids)
+
+def checkin_backlog_status(sheet_id):
+    """Show how many check-ins are not in the sheet yet, with a manual sync"""
+    queue = get_checkin_queue(sheet_id) if CHECKIN_MODE == "write_behind" else None
+    lines = backlog_status(journal, sheet_id, queue, "Google Sheets")
+    if not lines:
+        return
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        for line in lines:
+            st.caption(line)
+    with col2:
+        if st.button("🔄 Sync now"):
+            flush_checkin_buffer(sheet_id)
+            journal.recovered(sheet_id)
+            replay_journal(sheet_id)
+            st.rerun()
 
 def clear_sheet(sheet_id):
     """Clear all data from attendance sheet except header"""
-    sheets_service.spreadsheets().values().clear(
+    sheets.execute("values.clear", sheets_service.spreadsheets().values().clear(
         spreadsheetId=sheet_id, range="Sheet1!A2:Z"
-    ).execute()
+    ), kind="write")
+
+@st.cache_data
+def get_sheet_gid(sheet_id, title="Sheet1"):
+    """Numeric ID of a tab (deleteDimension needs it, not the tab name)"""
+    return sheets_client.sheet_gid(sheets, sheets_service, sheet_id, title)
+
+def delete_rows_matching(sheet_id, value, columns=("ID", "Matric")):
+    """Delete every row whose ID or Matric equals value in one batchUpdate (see sheets_client)"""
+    return sheets_client.delete_rows_matching(
+        sheets, sheets_service, sheet_id, value, lambda: get_sheet_gid(sheet_id), columns=columns
+    )
 # ==========================================================
 
 
@@ -97,6 +333,7 @@ def system(Title, mainId, attId):
 
         MAIN_SHEET_ID = mainId
         ATTENDANCE_SHEET_ID = attId
+        replay_journal(ATTENDANCE_SHEET_ID)
 
         # ---- session-state initialization ----
         if "attendance" not in st.session_state:
@@ -121,6 +358,11 @@ def system(Title, mainId, attId):
 
         try:
             df = read_sheet(MAIN_SHEET_ID)
+            # keep an offline copy for validation if Google Sheets goes down
+            main_hash = int(pd.util.hash_pandas_object(df, index=False).sum())
+            if st.session_state.get("main_snapshot_hash") != main_hash:
+                journal.save_main_list(MAIN_SHEET_ID, df[["Name", "Matric", "ID"]].itertuples(index=False, name=None))
+                st.session_state.main_snapshot_hash = main_hash
             msg_placeholder.success(f"ⴵ Load main list from {Title} record")
             time.sleep(2)
             msg_placeholder.empty()
@@ -131,8 +373,12 @@ def system(Title, mainId, attId):
 
 
         except Exception as e:
-            st.error(f"⚠ Failed to load main sheet: {e}")
-            st.stop()
+            snapshot = journal.load_main_list(MAIN_SHEET_ID)
+            if not snapshot:
+                st.error(f"⚠ Failed to load main sheet: {e}")
+                st.stop()
+            df = pd.DataFrame(snapshot, columns=["Name", "Matric", "ID"])
+            msg_placeholder.warning(f"📴 Google Sheets unreachable, using the offline copy of the main list ({e})")
 
         
 
@@ -143,19 +389,15 @@ def system(Title, mainId, attId):
 
     
 
-        # --- QR Decode using OpenCV (no zbar needed) ---
-    def decode_qr_from_image(image: Image.Image) -> str:
-        arr = np.array(image.convert("RGB"))
-        detector = cv2.QRCodeDetector()
-        data, _, _ = detector.detectAndDecode(arr)
-        return data or ""
-
-        # --- Handle query params safely ---
-        params = st.query_params  # new API replacing experimental_get_query_params
-
     with tabs[1]:#==========================================================Entry===============================================
     # --- Function to mark attendance ---
-        def mark_attendance(entered_val: str):
+        def mark_attendance(entered_val: str, scanned: bool = False):
+            try:
+                # signed tickets are checked before any lookup; typed values may be a Matric
+                entered_val = read_ticket(entered_val, Title, require_signed=None if scanned else False)
+            except TicketError as e:
+                st.session_state.message = f"🚫 {e}"
+                return
             entered_value = str(entered_val).strip().lower()
             if not entered_value:
                 st.session_state.message = "❌ Empty input."
@@ -169,22 +411,80 @@ def system(Title, mainId, attId):
             if not match.empty:
                 student_id = str(match.iloc[0]["ID"]).lower()
                 already = any(st.session_state.attendance["ID"].astype(str).str.lower() == student_id)
+                # journal first; it also catches repeats at this gate not yet synced
+                journal_row = match.iloc[0][["Name", "Matric", "ID"]].to_dict()
+                if not already and not journal.record(ATTENDANCE_SHEET_ID, journal_row):
+                    already = True
 
                 if not already:
                     new_row = match.iloc[0].tolist()
-                    # Append to Google Sheet
-                    append_to_sheet(ATTENDANCE_SHEET_ID, new_row)
+                    # Append to Google Sheet (buffered, see write_checkins)
+                    try:
+                        written = write_checkins(ATTENDANCE_SHEET_ID, [{"ID": journal_row["ID"], "values": new_row}])
+                    except Exception as e:
+                        st.session_state.message = f"❌ Google Sheets rejected the check-in: {e}"
+                        return
+                    if written:
+                        st.session_state.message = f"✅ {match.iloc[0]['Name']} marked present!"
+                    else:
+                        st.session_state.message = f"📴 {match.iloc[0]['Name']} saved offline, will sync when Google Sheets is back."
 
                     # Update local session cache
                     st.session_state.attendance = pd.concat(
                         [st.session_state.attendance, match], ignore_index=True
                     )
-                    st.session_state.message = f"✅ {match.iloc[0]['Name']} marked present!"
                 else:
                     st.session_state.message = "⚠ This student is already marked present."
             else:
                 st.session_state.message = "❌ No record found with that ID or Matric."
 
+        # --- Group check-in: every ticket in one frame, one lookup and one append ---
+        def mark_attendance_many(entered_vals):
+            lines, verified = [], []
+            for entered in entered_vals:
+                try:
+                    verified.append(read_ticket(entered, Title))
+                except TicketError as e:
+                    lines.append(f"🚫 {entered}: {e}")
+            entered_vals = verified
+            keys = [str(v).strip().lower() for v in entered_vals]
+            ids = df["ID"].astype(str).str.lower()
+            matrics = df["Matric"].astype(str).str.lower()
+            matches = df[ids.isin(keys) | matrics.isin(keys)]
+            by_key = {}
+            for pos in range(len(matches)):
+                by_key.setdefault(ids[matches.index[pos]], pos)
+                by_key.setdefault(matrics[matches.index[pos]], pos)
+            present = set(st.session_state.attendance["ID"].astype(str).str.lower())
+            new_positions = []
+            for entered, k in zip(entered_vals, keys):
+                pos = by_key.get(k)
+                if pos is None:
+                    lines.append(f"❌ {entered}: no record found.")
+                    continue
+                row = matches.iloc[pos]
+                student_id = str(row["ID"]).lower()
+                journal_row = row[["Name", "Matric", "ID"]].to_dict()
+                if student_id in present or not journal.record(ATTENDANCE_SHEET_ID, journal_row):
+                    lines.append(f"⚠ {row['Name']} is already marked present.")
+                else:
+                    present.add(student_id)
+                    new_positions.append(pos)
+                    lines.append(f"✅ {row['Name']} marked present!")
+            if new_positions:
+                new_rows = matches.iloc[new_positions]
+                rows = [{"ID": i, "values": v} for i, v in zip(new_rows["ID"].tolist(), new_rows.values.tolist())]
+                try:
+                    if not write_checkins(ATTENDANCE_SHEET_ID, rows):
+                        lines.append("📴 Saved offline, will sync when Google Sheets is back.")
+                except Exception as e:
+                    # nothing from this frame was written
+                    lines = [line for line in lines if not line.startswith("✅")]
+                    lines.append(f"❌ Google Sheets rejected the check-in: {e}")
+                else:
+                    st.session_state.attendance = pd.concat([st.session_state.attendance, new_rows], ignore_index=True)
+            st.session_state.message = "  \n".join(lines)
+
 
         # --- Manual Input Section ---
         st.subheader("📝 Manual Entry")
@@ -200,7 +500,57 @@ def system(Title, mainId, attId):
         if "message" in st.session_state:
             st.info(st.session_state.message)
 
+        checkin_backlog_status(ATTENDANCE_SHEET_ID)
+
         
+        # --- Live scanning (no snapshot + rerun per ticket) ---
+        def stop_live_scan():
+            scanner = st.session_state.pop("scanner", None)
+            # the server camera scanner is shared by every session, it stops once nobody reads it
+            if scanner is not None and st.session_state.get("scanner_mode") != "🖥 Server camera":
+                scanner.stop()
+            st.session_state.pop("scanner_mode", None)
+
+        def live_scan(scan_mode):
+            """Frames are decoded on a background worker; a fragment polls the results every 0.5s"""
+            if st.session_state.get("scanner_mode") != scan_mode or not st.session_state.scanner.running:
+                stop_live_scan()
+                if scan_mode == "🖥 Server camera":
+                    st.session_state.scanner = camera_scanner(SERVER_CAMERA)
+                else:
+                    # stops by itself if the session goes away without switching modes
+                    st.session_state.scanner = FrameScanner(idle_timeout=SCANNER_IDLE_TIMEOUT)
+                st.session_state.scanner_mode = scan_mode
+            scanner = st.session_state.scanner
+
+            if scan_mode == "🎥 Live stream":
+                def on_frame(frame):
+                    scanner.submit(frame.to_ndarray(format="gray"))
+                    return frame
+
+                webrtc_streamer(
+                    key="qr-live",
+                    video_frame_callback=on_frame,
+                    media_stream_constraints={"video": True, "audio": False},
+                )
+
+            @st.fragment(run_every=0.5)
+            def scan_results():
+                qr_values = scanner.events()
+                if len(qr_values) > 1:
+                    mark_attendance_many(qr_values)
+                elif qr_values:
+                    mark_attendance(qr_values[0], scanned=True)
+                if qr_values:
+                    st.session_state.last_qr = ", ".join(qr_values)
+                if st.session_state.get("last_qr"):
+                    st.success(f"QR scanned: {st.session_state.last_qr}")
+                if "message" in st.session_state:
+                    st.info(st.session_state.message)
+                st.caption(f"Frames decoded: {scanner.frames}")
+
+            scan_results()
+
         # --- Auto QR Scan section ---
         st.subheader("📷 QR Scan")
 
@@ -211,24 +561,40 @@ def system(Title, mainId, attId):
         with col1:
             if st.button("▶ Start Auto Scan"):
                 st.session_state.auto_scan = True
+                session_dedup(st.session_state).clear()
         with col2:
             if st.button("⏹ Stop Auto Scan"):
                 st.session_state.auto_scan = False
 
-        if st.session_state.auto_scan:
+        scan_mode = "📸 Snapshot"
+        if st.session_state.auto_scan and len(SCAN_MODES) > 1:
+            scan_mode = st.radio("Scan mode", SCAN_MODES, horizontal=True, key="scan_mode_choice")
+        if not st.session_state.auto_scan or scan_mode == "📸 Snapshot":
+            stop_live_scan()
+        else:
+            live_scan(scan_mode)
+
+        if st.session_state.auto_scan and scan_mode == "📸 Snapshot":
             img = st.camera_input("Show QR Code to camera")
-            if img is not None:
+            # camera_input keeps returning the same photo on every rerun; only a new one is decoded
+            if img is not None and session_dedup(st.session_state).is_new_frame(img.getbuffer()):
                 try:
-                    pil_img = Image.open(img)
-                    qr_value = decode_qr_from_image(pil_img)
-                    if qr_value:
-                        if st.session_state.get("last_qr") != qr_value:
-                            st.session_state.last_qr = qr_value
-                            st.success(f"QR scanned: {qr_value}")
-                            mark_attendance(qr_value)
-                            time.sleep(2)  # let user see the success message
-                            st.balloons()
-                            st.rerun()     # rerun to refresh attendance list
+                    # decoded straight from the upload buffer (no PIL image, no copy)
+                    qr_values = decode_all_qr_pooled(img.getbuffer())
+                    new_values = session_dedup(st.session_state).fresh(qr_values)
+                    if new_values:
+                        scanned = ", ".join(new_values)
+                        st.session_state.last_qr = scanned
+                        st.success(f"QR scanned: {scanned}")
+                        if len(new_values) > 1:
+                            mark_attendance_many(new_values)
+                        else:
+                            mark_attendance(new_values[0], scanned=True)
+                        time.sleep(2)  # let user see the success message
+                        st.balloons()
+                        st.rerun()     # rerun to refresh attendance list
+                    elif qr_values:
+                        st.info("Already scanned just now.")
                     else:
                         st.info("No QR detected — try again.")
                 except Exception as e:
@@ -275,21 +641,23 @@ def system(Title, mainId, attId):
                 val = delete_val.strip().lower()
                 if val:
                     before = len(st.session_state.attendance)
-                    st.session_state.attendance = st.session_state.attendance[
-                        ~(
-                            (st.session_state.attendance["ID"].astype(str).str.lower() == val)
-                            | (st.session_state.attendance["Matric"].astype(str).str.lower() == val)
-                        )
-                    ].reset_index(drop=True)
+                    matching = (
+                        (st.session_state.attendance["ID"].astype(str).str.lower() == val)
+                        | (st.session_state.attendance["Matric"].astype(str).str.lower() == val)
+                    )
+                    deleted_ids = set(st.session_state.attendance.loc[matching, "ID"].astype(str)) | {val}
+                    st.session_state.attendance = st.session_state.attendance[~matching].reset_index(drop=True)
                     after = len(st.session_state.attendance)
 
                     if after < before:
+                        journal.delete(ATTENDANCE_SHEET_ID, val)
+                        # a buffered row written after the delete would bring the attendee back
+                        drop_buffered_checkins(ATTENDANCE_SHEET_ID, deleted_ids)
+                        session_dedup(st.session_state).clear()
                         st.success(f"✅ Deleted record(s) matching '{val}'. Updating sheet...")
                         try:
-                            # ✅ Rewrite entire sheet cleanly without duplication
-                            clear_sheet(ATTENDANCE_SHEET_ID)
-                            for _, row in st.session_state.attendance.iterrows():
-                                append_to_sheet(ATTENDANCE_SHEET_ID, row.tolist())
+                            # ✅ Only the matching rows go, in a single request
+                            delete_rows_matching(ATTENDANCE_SHEET_ID, val)
                             st.info("updated successfully.")
                             time.sleep(2)
                             st.rerun()
@@ -311,7 +679,10 @@ def system(Title, mainId, attId):
 
             if st.button("🧹 Clear All") and st.session_state.clear_confirm:
                 try:
+                    drop_buffered_checkins(ATTENDANCE_SHEET_ID)
                     clear_sheet(ATTENDANCE_SHEET_ID)  # ✅ Clears all rows except header in Google Sheet
+                    journal.clear(ATTENDANCE_SHEET_ID)
+                    session_dedup(st.session_state).clear()
                     st.session_state.attendance = pd.DataFrame(columns=required_columns)
                     st.success("✅ Attendance sheet cleared successfully.")
                     time.sleep(2)
@@ -335,6 +706,16 @@ def system(Title, mainId, attId):
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
 
+        with st.expander("📶 Google Sheets Quota"):
+            stats = sheets.stats()
+            last_minute = stats["last_minute"]
+            st.caption(
+                f"Last minute: {last_minute['read']}/{SHEETS_READS_PER_MIN:.0f} reads, "
+                f"{last_minute['write']}/{SHEETS_WRITES_PER_MIN:.0f} writes"
+            )
+            if stats["endpoints"]:
+                st.dataframe(pd.DataFrame(stats["endpoints"]).T, use_container_width=True)
+
 def login(): 
             SHEET_URL = "https://docs.google.com/spreadsheets/d/1xPpPziu-iugDEvf-A79Y6qffjFK7MuCONY0haMQ-8y4/export?format=csv"
 
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from change_feed import AttendanceFeed, LocalChangeFeed  # noqa: E402
+
+
+def row(ticket_id, pk=None):
+    return {"id": pk, "Name": "Ali", "Matric": f"M{ticket_id}", "ID": ticket_id}
+
+
+def test_resync_replaces_stale_state_and_connects():
+    feed = AttendanceFeed()
+    feed.reset([row("A"), row("B")])
+    assert not feed.connected
+    # B was deleted and C checked in while the subscription was down
+    feed.resync(lambda: [row("A"), row("C")])
+    assert feed.connected
+    assert feed.has("C") and not feed.has("B")
+
+
+def test_events_during_resync_are_replayed_on_top():
+    feed = AttendanceFeed()
+    loading, release = threading.Event(), threading.Event()
+
+    def load():
+        loading.set()
+        release.wait(5)
+        return [row("A", 1)]
+
+    worker = threading.Thread(target=feed.resync, args=(load,))
+    worker.start()
+    loading.wait(5)
+    feed.apply("INSERT", row("B", 2))
+    feed.apply("DELETE", old_record={"id": 1})
+    assert not feed.connected
+    release.set()
+    worker.join(5)
+    assert feed.connected
+    assert feed.has("B") and not feed.has("A")
+
+
+def test_failed_resync_stays_disconnected():
+    feed = AttendanceFeed()
+    feed.reset([row("A")])
+
+    def load():
+        raise ConnectionError("offline")
+
+    with pytest.raises(ConnectionError):
+        feed.resync(load)
+    assert not feed.connected
+    feed.apply("INSERT", row("B"))  # no longer held back
+    assert feed.has("B")
+
+
+def test_delete_by_primary_key_or_matric():
+    feed = AttendanceFeed()
+    feed.reset([row("A", 1), row("B", 2)])
+    feed.apply("DELETE", old_record={"id": 1})
+    feed.apply("DELETE", {"Matric": "MB"})
+    assert len(feed) == 0
+
+
+def test_to_frame_follows_version():
+    feed = AttendanceFeed()
+    feed.reset([row("A")])
+    frame = feed.to_frame()
+    assert feed.to_frame() is frame
+    feed.apply("CLEAR")
+    assert feed.to_frame().empty
+
+
+def test_local_feed_unsubscribe():
+    changes, feed = LocalChangeFeed(), AttendanceFeed()
+    changes.subscribe("t", feed.apply)
+    changes.publish("t", "INSERT", row("A"))
+    changes.unsubscribe("t", feed.apply)
+    changes.publish("t", "INSERT", row("B"))
+    assert feed.has("A") and not feed.has("B")
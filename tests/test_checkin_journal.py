@@ -0,0 +1,117 @@
+from checkin_journal import CheckinJournal, backlog_status, open_journal
+
+
+def make_journal(tmp_path):
+    return CheckinJournal(str(tmp_path / "checkins.db"))
+
+
+def row(ticket_id, name="Ali", matric="2021123456"):
+    return {"Name": name, "Matric": matric, "ID": ticket_id}
+
+
+def test_pending_ticket_is_a_duplicate(tmp_path):
+    journal = make_journal(tmp_path)
+    assert journal.record("e", row("X"))
+    assert not journal.record("e", row("X"))
+    assert journal.pending_count("e") == 1
+
+
+def test_events_are_separate(tmp_path):
+    journal = make_journal(tmp_path)
+    assert journal.record("e", row("X"))
+    assert journal.record("other", row("X"))
+
+
+def test_synced_ticket_can_be_checked_in_again(tmp_path):
+    # a delete on the backend (another gate, the dashboard) must not lock the ticket out here
+    journal = make_journal(tmp_path)
+    journal.record("e", row("X"))
+    journal.mark_synced("e", ["X"])
+    assert journal.pending_count("e") == 0
+    assert journal.record("e", row("X", name="Abu"))
+    assert journal.pending("e") == [row("X", name="Abu")]
+    assert not journal.record("e", row("X"))
+
+
+def test_replay_marks_rows_synced_in_batches(tmp_path):
+    journal = make_journal(tmp_path)
+    for i in range(5):
+        journal.record("e", row(f"T{i}"))
+    pushed = []
+    assert journal.replay("e", pushed.append, batch_size=2) == 5
+    assert [len(b) for b in pushed] == [2, 2, 1]
+    assert journal.pending_count("e") == 0
+
+
+def test_replay_stops_at_failure_and_skips(tmp_path):
+    journal = make_journal(tmp_path)
+    for i in range(3):
+        journal.record("e", row(f"T{i}"))
+
+    def fail(rows):
+        raise ConnectionError("offline")
+
+    assert journal.replay("e", fail) == 0
+    assert "e" in journal.last_failure
+    assert journal.pending_count("e") == 3
+
+    pushed = []
+    assert journal.replay("e", pushed.extend, skip={"T1"}) == 2
+    assert [r["ID"] for r in pushed] == ["T0", "T2"]
+    assert "e" not in journal.last_failure
+    assert [r["ID"] for r in journal.pending("e")] == ["T1"]
+
+
+def test_offline_backoff(tmp_path, monkeypatch):
+    journal = make_journal(tmp_path)
+    assert not journal.offline("e")
+    monkeypatch.setattr("checkin_journal.time.time", lambda: 1000.0)
+    journal.failed("e", ConnectionError("offline"))
+    assert journal.offline("e", retry=30)
+    assert journal.offline(retry=30)  # any event
+    assert not journal.offline("other", retry=30)
+    monkeypatch.setattr("checkin_journal.time.time", lambda: 1031.0)
+    assert not journal.offline("e", retry=30)
+    journal.recovered("e")
+    assert "e" not in journal.last_failure
+
+
+def test_replay_waits_out_a_recent_failure(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.record("e", row("X"))
+    journal.failed("e", ConnectionError("offline"))
+    pushed = []
+    assert journal.replay("e", pushed.extend, retry=30) == 0
+    assert pushed == []
+    assert journal.replay("e", pushed.extend) == 1
+
+
+def test_open_journal_is_shared_per_file(tmp_path):
+    path = str(tmp_path / "checkins.db")
+    assert open_journal(path) is open_journal(path)
+
+
+def test_backlog_status(tmp_path):
+    journal = make_journal(tmp_path)
+    assert backlog_status(journal, "e") == []
+    journal.record("e", row("X"))
+    journal.failed("e", ConnectionError("offline"))
+    lines = backlog_status(journal, "e", backend="Supabase")
+    assert lines[0] == "⏳ 1 check-in(s) waiting to sync to Supabase"
+    assert "offline" in lines[1]
+
+
+def test_delete_by_id_or_matric(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.record("e", row("X", matric="M1"))
+    journal.record("e", row("Y", matric="M2"))
+    journal.delete("e", "x")
+    journal.delete("e", "m2")
+    assert journal.pending_count("e") == 0
+
+
+def test_main_list_snapshot(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.save_main_list("e", [("Ali", "M1", "X"), ("Abu", None, "Y")])
+    journal.save_main_list("e", [("Ali", "M1", "X")])
+    assert journal.load_main_list("e") == [("Ali", "M1", "X")]
@@ -0,0 +1,157 @@
+import threading
+
+import pytest
+
+from checkin_queue import WriteBehindQueue
+
+
+@pytest.fixture
+def written():
+    return []
+
+
+@pytest.fixture
+def queue(written):
+    # a long interval, so only explicit flushes write
+    q = WriteBehindQueue(written.extend, interval_ms=60_000, max_rows=3)
+    yield q
+    q.close()
+
+
+def test_put_deduplicates_waiting_rows(queue):
+    assert queue.put({"ID": "X"})
+    assert not queue.put({"ID": "X"})
+    assert "X" in queue
+    assert queue.backlog() == 1
+
+
+def test_flush_writes_in_batches(queue, written):
+    for i in range(7):
+        queue.put({"ID": f"T{i}"})
+    # a full batch wakes the worker, which may write part of it before this flush
+    queue.flush()
+    assert [r["ID"] for r in written] == [f"T{i}" for i in range(7)]
+    assert queue.backlog() == 0
+    assert queue.flushed == 7
+
+
+def test_failed_flush_keeps_rows_in_order():
+    calls = []
+
+    def flush_fn(rows):
+        calls.append([r["ID"] for r in rows])
+        if len(calls) == 1:
+            raise ConnectionError("offline")
+
+    q = WriteBehindQueue(flush_fn, interval_ms=60_000)
+    q.put({"ID": "A"})
+    assert q.flush() == 0
+    assert isinstance(q.last_error, ConnectionError)
+    q.put({"ID": "B"})
+    assert q.flush() == 2
+    assert calls[-1] == ["A", "B"]
+    assert q.last_error is None
+    q.close()
+
+
+def test_refused_rows_are_isolated_and_the_rest_written():
+    written, refused = [], []
+
+    def flush_fn(rows):
+        if any(r["ID"] == "BAD" for r in rows):
+            raise ValueError("constraint violated")
+        written.extend(r["ID"] for r in rows)
+
+    q = WriteBehindQueue(
+        flush_fn, interval_ms=60_000, max_rows=10,
+        retryable=lambda e: isinstance(e, ConnectionError), on_reject=lambda row, e: refused.append(row["ID"]),
+    )
+    for ticket in ("A", "B", "BAD", "C", "D"):
+        q.put({"ID": ticket})
+    assert q.flush() == 4
+    assert written == ["A", "B", "C", "D"]
+    assert refused == ["BAD"]
+    assert [row["ID"] for row, _ in q.rejected] == ["BAD"]
+    assert q.backlog() == 0 and q.last_error is None
+    q.close()
+
+
+def test_retryable_error_while_isolating_keeps_the_rest_queued():
+    calls = []
+
+    def flush_fn(rows):
+        calls.append([r["ID"] for r in rows])
+        if len(calls) == 1:
+            raise ValueError("refused")
+        if len(calls) == 3:
+            raise ConnectionError("offline")
+
+    q = WriteBehindQueue(flush_fn, interval_ms=60_000, retryable=lambda e: isinstance(e, ConnectionError))
+    for ticket in ("A", "B", "C", "D"):
+        q.put({"ID": ticket})
+    assert q.flush() == 2  # A, B written, then the network went
+    assert isinstance(q.last_error, ConnectionError)
+    assert not q.rejected
+    assert q.flush() == 2
+    assert calls == [["A", "B", "C", "D"], ["A", "B"], ["C", "D"], ["C", "D"]]
+    q.close()
+
+
+def test_discard_matching_rows(queue, written):
+    for i in range(4):
+        queue.put({"ID": f"T{i}"})
+    assert queue.discard(lambda r: r["ID"] in ("T1", "T3")) == 2
+    queue.flush()
+    assert [r["ID"] for r in written] == ["T0", "T2"]
+
+
+def test_discard_all(queue, written):
+    queue.put({"ID": "A"})
+    queue.put({"ID": "B"})
+    assert queue.discard() == 2
+    assert queue.flush() == 0
+    assert written == []
+
+
+def test_discarded_row_is_not_written_after_a_failed_flush():
+    # a delete while the backend is down must not be undone once it recovers
+    written, fail = [], [True]
+
+    def flush_fn(rows):
+        if fail[0]:
+            raise ConnectionError("offline")
+        written.extend(rows)
+
+    q = WriteBehindQueue(flush_fn, interval_ms=60_000)
+    q.put({"ID": "X"})
+    q.flush()
+    q.discard(lambda r: r["ID"] == "X")
+    fail[0] = False
+    q.flush()
+    assert written == []
+    q.close()
+
+
+def test_discard_waits_for_a_running_flush():
+    started, release, written = threading.Event(), threading.Event(), []
+
+    def flush_fn(rows):
+        started.set()
+        release.wait(5)
+        written.extend(rows)
+
+    q = WriteBehindQueue(flush_fn, interval_ms=60_000)
+    q.put({"ID": "X"})
+    flusher = threading.Thread(target=q.flush)
+    flusher.start()
+    started.wait(5)
+    dropped = []
+    discarder = threading.Thread(target=lambda: dropped.append(q.discard()))
+    discarder.start()
+    discarder.join(0.1)
+    assert discarder.is_alive()  # blocked until the write finishes
+    release.set()
+    flusher.join(5)
+    discarder.join(5)
+    assert written == [{"ID": "X"}] and dropped == [0]
+    q.close()
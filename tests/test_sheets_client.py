@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("google_auth_httplib2")
+pytest.importorskip("googleapiclient")
+
+import httplib2  # noqa: E402
+from googleapiclient.errors import HttpError  # noqa: E402
+
+import sheets_client  # noqa: E402
+from sheets_client import SheetsClient, TokenBucket  # noqa: E402
+
+
+class FakeRequest:
+    """Stands in for a googleapiclient request: fails with the given statuses, then returns `result`"""
+
+    def __init__(self, statuses=(), result=None, gate=None):
+        self.statuses = list(statuses)
+        self.result = result if result is not None else {"ok": True}
+        self.gate = gate
+        self.calls = 0
+        self.started = threading.Event()
+
+    def execute(self, http=None):
+        self.calls += 1
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.statuses:
+            raise HttpError(httplib2.Response({"status": self.statuses.pop(0)}), b"")
+        return self.result
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    slept = []
+    monkeypatch.setattr(sheets_client.time, "sleep", slept.append)
+    return slept
+
+
+def test_bucket_paces_calls_after_the_burst(monkeypatch, no_sleep):
+    monkeypatch.setattr(sheets_client.time, "monotonic", lambda: 100.0)
+    bucket = TokenBucket(rate=10, capacity=2)
+    waits = [bucket.acquire() for _ in range(4)]
+    assert waits == [0.0, 0.0, pytest.approx(0.1), pytest.approx(0.2)]
+    assert no_sleep == waits[2:]
+
+
+def test_bucket_refills_over_time(monkeypatch, no_sleep):
+    now = [100.0]
+    monkeypatch.setattr(sheets_client.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=10, capacity=1)
+    assert bucket.acquire() == 0.0
+    now[0] += 0.5  # refills, but only up to capacity
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.1)
+
+
+def test_write_is_retried_on_429(no_sleep):
+    client = SheetsClient(None, reads_per_min=6000, writes_per_min=6000)
+    request = FakeRequest(statuses=[429])
+    assert client.execute("values.append", request, kind="write") == {"ok": True}
+    assert request.calls == 2
+    assert client.stats()["endpoints"]["values.append"]["retries"] == 1
+
+
+def test_write_is_not_retried_on_500(no_sleep):
+    client = SheetsClient(None, reads_per_min=6000, writes_per_min=6000)
+    request = FakeRequest(statuses=[500])
+    with pytest.raises(HttpError):
+        client.execute("values.append", request, kind="write")
+    assert request.calls == 1
+
+
+def test_read_is_retried_on_500(no_sleep):
+    client = SheetsClient(None, reads_per_min=6000, writes_per_min=6000)
+    request = FakeRequest(statuses=[500, 503])
+    assert client.execute("values.get", request) == {"ok": True}
+    assert request.calls == 3
+
+
+def test_concurrent_reads_with_the_same_key_share_one_request():
+    client = SheetsClient(None, reads_per_min=6000, writes_per_min=6000)
+    gate = threading.Event()
+    request = FakeRequest(result={"values": [["ID"]]}, gate=gate)
+    results = []
+
+    def read():
+        results.append(client.execute("values.get", request, key=("values.get", "sheet")))
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    threads[0].start()
+    assert request.started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    deadline = time.monotonic() + 5
+    while client.stats()["endpoints"]["values.get"].get("coalesced", 0) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert request.calls == 1
+    assert results == [{"values": [["ID"]]}] * 4
+    assert client.stats()["endpoints"]["values.get"]["coalesced"] == 3
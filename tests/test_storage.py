@@ -0,0 +1,42 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from storage import CsvStorage  # noqa: E402
+
+
+def main_list():
+    return pd.DataFrame([
+        {"Name": "Ali", "Matric": "232542", "ID": "T1"},
+        {"Name": "Abu", "Matric": "T1", "ID": "T2"},  # Matric clashes with the first ID
+        {"Name": "Siti", "Matric": "232544", "ID": "T3"},
+    ])
+
+
+def test_check_in_statuses_and_first_row_wins(tmp_path):
+    storage = CsvStorage(main_list(), str(tmp_path / "att.csv"))
+    assert storage.lookup("t1")["Name"] == "Ali"
+    assert storage.check_in(["T1", "232542", "nope", "T3 "]) == ["created", "present", "unknown", "created"]
+    assert storage.check_in(["t3"]) == ["present"]
+    assert sorted(storage.export()["ID"]) == ["T1", "T3"]
+
+
+def test_delete_and_clear(tmp_path):
+    storage = CsvStorage(main_list(), str(tmp_path / "att.csv"))
+    storage.check_in(["T1", "T3"])
+    assert storage.delete("232544") == 1
+    assert storage.delete("232544") == 0
+    assert storage.check_in(["T3"]) == ["created"]
+    storage.clear()
+    assert storage.export().empty
+    assert storage.check_in(["T1"]) == ["created"]
+
+
+def test_append_keeps_existing_columns(tmp_path):
+    path = tmp_path / "att.csv"
+    path.write_text("Name,Matric,ID,Faculty\nAli,232542,T1,FSKM\n")
+    storage = CsvStorage(main_list(), str(path))
+    assert storage.check_in(["T1", "T3"]) == ["present", "created"]
+    att = pd.read_csv(path, dtype=str)
+    assert list(att.columns) == ["Name", "Matric", "ID", "Faculty"]
+    assert list(att["ID"]) == ["T1", "T3"]
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from ticket_import import (  # noqa: E402
+    ImportCheckpoints, clean_cell, file_fingerprint, iter_ticket_chunks, normalize_ticket, normalize_ticket_chunk,
+)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, ""),
+    (float("nan"), ""),
+    (2021123456.0, "2021123456"),
+    (1.5, "1.5"),
+    ("  B8QN9YJN ", "B8QN9YJN"),
+])
+def test_clean_cell(value, expected):
+    assert clean_cell(value) == expected
+
+
+def test_normalize_ticket_is_clean_cell_lowercased():
+    assert normalize_ticket(" B8qn9YJN ") == "b8qn9yjn"
+    assert normalize_ticket(123.0) == "123"
+
+
+def test_csv_chunks_are_cleaned():
+    data = b"name,MATRIC,Id,extra\nAli,M1, X ,a\nAbu,M2,,b\nAli again,M1,X,c\nSiti,M3,Y,d\n"
+    chunks = list(iter_ticket_chunks(io.BytesIO(data), "list.csv", chunk_size=2))
+    assert [len(c) for c, _ in chunks] == [2, 2]
+    assert chunks[-1][1] == 1.0
+    rows = [r for c, _ in chunks for r in normalize_ticket_chunk(c).to_dict("records")]
+    assert rows == [
+        {"Name": "Ali", "Matric": "M1", "ID": "X"},
+        {"Name": "Ali again", "Matric": "M1", "ID": "X"},
+        {"Name": "Siti", "Matric": "M3", "ID": "Y"},
+    ]
+
+
+def test_missing_columns():
+    chunk, _ = next(iter_ticket_chunks(io.BytesIO(b"Name,ID\nAli,X\n"), "list.csv"))
+    with pytest.raises(ValueError, match="Matric"):
+        normalize_ticket_chunk(chunk)
+
+
+def test_fingerprint_follows_content():
+    a, b = io.BytesIO(b"ID\nX\n"), io.BytesIO(b"ID\nY\n")
+    assert file_fingerprint(a) != file_fingerprint(b)
+    assert file_fingerprint(a) == file_fingerprint(io.BytesIO(b"ID\nX\n"))
+    assert a.tell() == 0
+
+
+def test_checkpoints_survive_a_restart(tmp_path):
+    path = str(tmp_path / "checkins.db")
+    checkpoints = ImportCheckpoints(path)
+    assert checkpoints.get("Main_RockIndie", "abc") == 0
+    checkpoints.set("Main_RockIndie", "abc", 500)
+    checkpoints.set("Main_RockIndie", "abc", 1000)
+    reopened = ImportCheckpoints(path)
+    assert reopened.get("Main_RockIndie", "abc") == 1000
+    assert reopened.get("Main_Other", "abc") == 0
+    reopened.clear("Main_RockIndie", "abc")
+    assert reopened.get("Main_RockIndie", "abc") == 0
@@ -0,0 +1,87 @@
+import pytest
+
+from tickets import TicketError, event_tag, is_signed, read_ticket, sign_ticket
+
+KEY = "test-key"
+EVENT = "Main_RockIndie"
+
+
+def test_event_tag():
+    assert event_tag("Main_RockIndie") == "main-rockindie"
+    assert event_tag(" TEATER  MALAM ") == "teater-malam"
+
+
+def test_sign_and_verify():
+    payload = sign_ticket("B8QN9YJN", EVENT, key=KEY)
+    assert payload.startswith("OT1.main-rockindie.B8QN9YJN.0.")
+    assert is_signed(payload)
+    assert read_ticket(payload, EVENT, key=KEY) == "B8QN9YJN"
+
+
+def test_event_name_spelling_does_not_matter():
+    payload = sign_ticket("B8QN9YJN", "main rockindie", key=KEY)
+    assert read_ticket(payload, "MAIN_ROCKINDIE", key=KEY) == "B8QN9YJN"
+
+
+def test_plain_values_pass_through_unless_signed_required():
+    assert read_ticket(" 2021123456 ", EVENT, key=KEY, require_signed=False) == "2021123456"
+    with pytest.raises(TicketError, match="Unsigned"):
+        read_ticket("2021123456", EVENT, key=KEY, require_signed=True)
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda p: p.replace("B8QN9YJN", "B8QN9YJX"),  # other ticket ID
+    lambda p: p[:-1] + ("A" if p[-1] != "A" else "B"),  # altered signature
+])
+def test_forged(tamper):
+    payload = tamper(sign_ticket("B8QN9YJN", EVENT, key=KEY))
+    with pytest.raises(TicketError, match="signature"):
+        read_ticket(payload, EVENT, key=KEY)
+
+
+def test_wrong_key():
+    payload = sign_ticket("B8QN9YJN", EVENT, key="other-key")
+    with pytest.raises(TicketError, match="signature"):
+        read_ticket(payload, EVENT, key=KEY)
+
+
+def test_expired():
+    payload = sign_ticket("B8QN9YJN", EVENT, expires=1000, key=KEY)
+    assert read_ticket(payload, EVENT, key=KEY, now=999) == "B8QN9YJN"
+    with pytest.raises(TicketError, match="expired"):
+        read_ticket(payload, EVENT, key=KEY, now=1001)
+
+
+def test_other_event():
+    payload = sign_ticket("B8QN9YJN", "ENTRY_GALAU3.0", key=KEY)
+    with pytest.raises(TicketError, match="another event"):
+        read_ticket(payload, EVENT, key=KEY)
+
+
+@pytest.mark.parametrize("payload", [
+    "OT1.",
+    "OT1.main-rockindie.B8QN9YJN.0",
+    "OT1.main-rockindie.B8QN9YJN.0.sig.extra",
+    "OT1.main-rockindie.X.0.é",  # non-ASCII signature
+    "OT1.main-rockindie.X.0.٣٣",  # non-ASCII digits
+])
+def test_malformed_raises_ticket_error(payload):
+    with pytest.raises(TicketError):
+        read_ticket(payload, EVENT, key=KEY)
+
+
+def test_gate_without_key_rejects_signed_tickets():
+    payload = sign_ticket("B8QN9YJN", EVENT, key=KEY)
+    with pytest.raises(TicketError, match="no TICKET_SIGNING_KEY"):
+        read_ticket(payload, EVENT, key="")
+
+
+@pytest.mark.parametrize("ticket_id", ["", "  ", "A.B"])
+def test_unsignable_ids(ticket_id):
+    with pytest.raises(TicketError):
+        sign_ticket(ticket_id, EVENT, key=KEY)
+
+
+def test_sign_without_key():
+    with pytest.raises(TicketError):
+        sign_ticket("B8QN9YJN", EVENT, key="")
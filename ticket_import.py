@@ -0,0 +1,131 @@
+"""
+Ticket list import helpers.
+
+Streams an uploaded CSV/XLSX ticket list in chunks of Name/Matric/ID rows and
+keeps a resumable checkpoint per (table, file) in SQLite, so an import cut off
+by a crash or a server restart picks up after the last chunk written.
+"""
+import hashlib
+import math
+import sqlite3
+import threading
+
+import pandas as pd
+
+COLUMNS = ["Name", "Matric", "ID"]
+CHUNK_ROWS = 500
+
+
+def clean_cell(value) -> str:
+    """Excel/CSV cell to a trimmed string (123.0 -> "123", empty/NaN -> "")"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def normalize_ticket(value) -> str:
+    """Normalize an ID/Matric value for lookups"""
+    return clean_cell(value).lower()
+
+
+def iter_ticket_chunks(file, name: str = None, chunk_size: int = CHUNK_ROWS):
+    """
+    Stream a CSV/XLSX file object as (DataFrame of up to chunk_size rows, fraction
+    done), without loading the whole sheet into memory. The format comes from
+    `name` (default file.name).
+    """
+    name = name or getattr(file, "name", "")
+    if name.lower().endswith(".csv"):
+        file.seek(0, 2)
+        size = max(file.tell(), 1)
+        file.seek(0)
+        for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            yield chunk, min(1.0, file.tell() / size)
+        return
+    import openpyxl
+
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        total = max((ws.max_row or 1) - 1, 1)
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, [])]
+        batch = []
+        seen = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_size:
+                seen += len(batch)
+                yield pd.DataFrame(batch, columns=header), min(1.0, seen / total)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header), 1.0
+    finally:
+        wb.close()
+
+
+def normalize_ticket_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Pick the Name/Matric/ID columns (any case), trim values, drop rows without an ID"""
+    rename = {}
+    for col in chunk.columns:
+        for wanted in COLUMNS:
+            if str(col).strip().lower() == wanted.lower():
+                rename[col] = wanted
+    chunk = chunk.rename(columns=rename)
+    missing = [c for c in COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    chunk = chunk[COLUMNS].apply(lambda col: col.map(clean_cell))
+    chunk = chunk[chunk["ID"] != ""]
+    return chunk.drop_duplicates(subset="ID", keep="last")
+
+
+def file_fingerprint(file) -> str:
+    """Hash of a file object's content, so a checkpoint only resumes the very same file"""
+    digest = hashlib.blake2b(digest_size=16)
+    file.seek(0)
+    for block in iter(lambda: file.read(1 << 20), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class ImportCheckpoints:
+    """Rows already imported per (table, file fingerprint), kept in SQLite"""
+
+    def __init__(self, path: str = "checkins.db"):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS import_checkpoints (
+                    target TEXT NOT NULL,
+                    file TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    PRIMARY KEY (target, file)
+                )"""
+            )
+
+    def get(self, target: str, file: str) -> int:
+        """Rows of `file` already written to `target` (0 if none)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT rows FROM import_checkpoints WHERE target = ? AND file = ?", (target, file)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def set(self, target: str, file: str, rows: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO import_checkpoints (target, file, rows) VALUES (?, ?, ?) "
+                "ON CONFLICT (target, file) DO UPDATE SET rows = excluded.rows",
+                (target, file, rows),
+            )
+
+    def clear(self, target: str, file: str):
+        """Forget a finished import"""
+        with self._lock:
+            self._conn.execute("DELETE FROM import_checkpoints WHERE target = ? AND file = ?", (target, file))
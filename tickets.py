@@ -0,0 +1,232 @@
+"""
+Signed ticket payloads.
+
+A signed ticket QR carries its own proof of validity, so a gate can reject
+forged or other-event tickets locally, before any main-list lookup or
+network call:
+
+    OT1.<event>.<ticket id>.<expiry>.<signature>
+
+<event> is the gate's event key slugged (see event_tag): the Supabase main
+table on the Supabase pages, the event title on the Sheets/CSV pages.
+<expiry> is a Unix time (0 = never) and <signature> a truncated HMAC-SHA256
+over everything before it, keyed with TICKET_SIGNING_KEY. Plain IDs/Matrics are still accepted
+unless REQUIRE_SIGNED_TICKETS is set.
+
+Ticket images for a whole list are rendered on a process pool and streamed
+into a zip (one PNG, optionally one PDF, per ticket):
+
+    python tickets.py sign Main_RockIndie B8QN9YJN --days 30
+    python tickets.py verify Main_RockIndie "OT1.main-rockindie.B8QN9YJN.1767225600.xxxx"
+    python tickets.py generate ENTRY.xlsx --event Main_RockIndie --sign --pdf -o tickets.zip
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import io
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+PREFIX = "OT1"
+SIGNATURE_BYTES = 16
+
+SIGNING_KEY = os.environ.get("TICKET_SIGNING_KEY", "")
+REQUIRE_SIGNED = os.environ.get("REQUIRE_SIGNED_TICKETS", "").lower() in ("1", "true", "yes")
+
+
+class TicketError(ValueError):
+    """A scanned ticket that failed verification (forged, expired, other event)"""
+
+
+def event_tag(event: str) -> str:
+    """Event name as it appears in the payload, e.g. "TEATER MALAM" -> "teater-malam" """
+    return re.sub(r"[^a-z0-9]+", "-", str(event).lower()).strip("-")
+
+
+def _signature(message: str, key: str) -> str:
+    digest = hmac.new(key.encode(), message.encode(), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def sign_ticket(ticket_id, event: str, expires: int = 0, key: str = None) -> str:
+    """Signed QR payload for a ticket; `expires` is a Unix time, 0 for no expiry"""
+    key = SIGNING_KEY if key is None else key
+    if not key:
+        raise TicketError("TICKET_SIGNING_KEY is not set")
+    ticket_id = str(ticket_id).strip()
+    if not ticket_id or "." in ticket_id:
+        raise TicketError(f"ticket ID {ticket_id!r} can't be signed (empty or contains '.')")
+    message = f"{PREFIX}.{event_tag(event)}.{ticket_id}.{int(expires)}"
+    return f"{message}.{_signature(message, key)}"
+
+
+def is_signed(value) -> bool:
+    return str(value).strip().startswith(PREFIX + ".")
+
+
+def read_ticket(value, event: str, key: str = None, require_signed: bool = None, now: float = None) -> str:
+    """
+    Ticket ID (or Matric) from a scanned value. Signed payloads are verified and
+    raise TicketError when forged, expired or issued for another event; plain
+    values are returned as they are, unless signed tickets are required.
+    """
+    value = str(value).strip()
+    if not is_signed(value):
+        if REQUIRE_SIGNED if require_signed is None else require_signed:
+            raise TicketError("Unsigned ticket, this event only accepts signed tickets.")
+        return value
+
+    key = SIGNING_KEY if key is None else key
+    if not key:
+        raise TicketError("Signed ticket, but this gate has no TICKET_SIGNING_KEY.")
+    parts = value.split(".")
+    if len(parts) != 5:
+        raise TicketError("Malformed ticket.")
+    _, tag, ticket_id, expires, signature = parts
+    message = value.rsplit(".", 1)[0]
+    # bytes, as compare_digest refuses str with non-ASCII characters (any QR can be scanned)
+    if not hmac.compare_digest(signature.encode(), _signature(message, key).encode()):
+        raise TicketError("Invalid ticket signature (forged or altered).")
+    if tag != event_tag(event):
+        raise TicketError(f"Ticket is for another event ({tag}).")
+    if not (expires.isascii() and expires.isdigit()):
+        raise TicketError("Malformed ticket.")
+    if int(expires) and int(expires) < (time.time() if now is None else now):
+        raise TicketError("Ticket has expired.")
+    return ticket_id
+
+
+# --- Ticket generation ---
+MODULE_PX = 10  # QR module size in the rendered image
+LABEL_PX = 70   # strip under the code for the name and ID
+
+
+def ticket_image(row: dict, event: str = "", sign: bool = False, expires: int = 0, key: str = None,
+                 module_px: int = MODULE_PX):
+    """Grayscale ticket image: the QR code (signed payload if asked) with Name/ID under it"""
+    import cv2
+    import numpy as np
+
+    ticket_id = str(row["ID"]).strip()
+    payload = sign_ticket(ticket_id, event, expires, key) if sign else ticket_id
+    code = cv2.QRCodeEncoder.create().encode(payload)
+    code = cv2.copyMakeBorder(code, 4, 4, 4, 4, cv2.BORDER_CONSTANT, value=255)  # quiet zone
+    code = cv2.resize(code, None, fx=module_px, fy=module_px, interpolation=cv2.INTER_NEAREST)
+    image = np.full((code.shape[0] + LABEL_PX, code.shape[1]), 255, np.uint8)
+    image[: code.shape[0]] = code
+    for i, text in enumerate((row.get("Name"), ticket_id)):
+        # Hershey fonts are ASCII only
+        text = str(text or "").encode("ascii", "replace").decode()
+        cv2.putText(image, text, (20, code.shape[0] + 25 + i * 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, 0, 2)
+    return image
+
+
+def render_ticket(row: dict, event: str = "", sign: bool = False, expires: int = 0, pdf: bool = False, key: str = None) -> list:
+    """[(file name, bytes)] for one ticket: a PNG of ticket_image(), plus a PDF if asked"""
+    import cv2
+
+    image = ticket_image(row, event, sign, expires, key)
+    name = re.sub(r"[^A-Za-z0-9_-]+", "_", str(row["ID"]).strip())
+    files = [(f"{name}.png", cv2.imencode(".png", image)[1].tobytes())]
+    if pdf:
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.fromarray(image).save(buf, format="PDF", resolution=150)
+        files.append((f"{name}.pdf", buf.getvalue()))
+    return files
+
+
+def ticket_rows_from_excel(path: str):
+    """Name/Matric/ID rows of an ENTRY*.xlsx (or .csv) list"""
+    import pandas as pd
+
+    df = pd.read_csv(path) if str(path).lower().endswith(".csv") else pd.read_excel(path)
+    df = df.rename(columns={c: str(c).strip().title() if str(c).strip().lower() != "id" else "ID" for c in df.columns})
+    for row in df.dropna(subset=["ID"]).to_dict("records"):
+        yield row
+
+
+def generate_tickets(rows, out, event: str = "", sign: bool = False, expires: int = 0, pdf: bool = False,
+                     workers: int = None, progress=None) -> int:
+    """
+    Render a ticket per row on a process pool and write them into the zip `out`
+    (path or binary file). Only a few batches are in flight at once, so memory
+    stays flat however long the list is. progress(done) is called per ticket.
+    Returns the number of tickets written.
+    """
+    if sign and not SIGNING_KEY:
+        raise TicketError("TICKET_SIGNING_KEY is not set")
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4
+    done = 0
+    # PNG is already compressed, deflating it again only costs time
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as zf, ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        pending = deque()
+        rows = iter(rows)
+        while True:
+            while len(pending) < window:
+                row = next(rows, None)
+                if row is None:
+                    break
+                row = {"Name": row.get("Name"), "Matric": row.get("Matric"), "ID": row.get("ID")}
+                pending.append(pool.submit(render_ticket, row, event, sign, expires, pdf, SIGNING_KEY))
+            if not pending:
+                return done
+            for name, data in pending.popleft().result():  # oldest first keeps the zip in list order
+                zf.writestr(name, data)
+            done += 1
+            if progress is not None:
+                progress(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sign, verify or generate ticket QR codes")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sign = sub.add_parser("sign", help="print the signed payload for ticket IDs")
+    sign.add_argument("event")
+    sign.add_argument("ids", nargs="+")
+    sign.add_argument("--days", type=float, default=0, help="valid for this many days (0 = no expiry)")
+    verify = sub.add_parser("verify", help="check a scanned payload")
+    verify.add_argument("event")
+    verify.add_argument("payload")
+    generate = sub.add_parser("generate", help="render a QR ticket per row of an ENTRY list into a zip")
+    generate.add_argument("entries", help="ENTRY*.xlsx or .csv with Name, Matric and ID columns")
+    generate.add_argument("--event", default="", help="event key, needed with --sign")
+    generate.add_argument("-o", "--out", default="tickets.zip")
+    generate.add_argument("--sign", action="store_true", help="signed payloads instead of bare IDs")
+    generate.add_argument("--days", type=float, default=0, help="signed tickets expire after this many days")
+    generate.add_argument("--pdf", action="store_true", help="also a one-page PDF per ticket")
+    generate.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        expires = int(time.time() + args.days * 86400) if args.days else 0
+        start = time.time()
+        n = generate_tickets(
+            ticket_rows_from_excel(args.entries), args.out, args.event, args.sign, expires, args.pdf, args.workers
+        )
+        print(f"{n} tickets written to {args.out} in {time.time() - start:.1f}s")
+        return
+
+    if args.command == "sign":
+        expires = int(time.time() + args.days * 86400) if args.days else 0
+        for ticket_id in args.ids:
+            print(sign_ticket(ticket_id, args.event, expires))
+    else:
+        try:
+            print(f"valid: {read_ticket(args.payload, args.event)}")
+        except TicketError as e:
+            parser.exit(1, f"invalid: {e}\n")
+
+
+if __name__ == "__main__":
+    main()